@@ -2,14 +2,52 @@
 PDF Unlock API - Simple FastAPI application for unlocking password-protected PDFs.
 """
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import Body, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+import asyncio
+import hashlib
+import json
+import logging
 import os
-import uuid
-from datetime import datetime, timedelta
-from urllib.parse import unquote
-from typing import List
+import re
+import secrets
+import shutil
+import time
+from urllib.parse import quote
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, Callable, List, Optional, Set, Tuple, Union
+
+from app.utils.file_store import create_file_store, remove_file
+from app.utils.process_pool import create_executor, run_in_executor
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib encoder."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the expired-file cleanup while serving; release connections and workers on shutdown."""
+    cleanup_task = asyncio.create_task(_cleanup_loop())
+    yield
+    cleanup_task.cancel()
+    await file_store.close()
+    if conversion_executor is not None:
+        conversion_executor.shutdown(cancel_futures=True)
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -18,8 +56,100 @@ app = FastAPI(
     description="A simple API for unlocking and locking password-protected PDF files",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse,
+    lifespan=lifespan,
 )
 
+# Request bodies larger than this are rejected with 413
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized request bodies before they are spooled to disk.
+    
+    A declared Content-Length is checked before any of the body is read.
+    Bodies sent without one (chunked uploads) are counted as they arrive and
+    cut off with the same 413 once they pass the limit.
+    """
+    
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        detail = f"Request body must be at most {self.max_bytes} bytes"
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    response = JSONResponse({"detail": detail}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                # The server enforces a declared length, so no counting needed
+                await self.app(scope, receive, send)
+                return
+        
+        received = 0
+        
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised while the body is parsed, so it becomes a normal 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, receive_limited, send)
+
+
+# POST requests (conversions, password attempts, batch deletes) allowed per
+# client IP per minute. Off (0) unless configured: behind a proxy the client IP
+# is only real once the proxy is trusted (FORWARDED_ALLOW_IPS), and without
+# REDIS_URL every web worker counts separately
+RATE_LIMIT_PER_MINUTE = int(os.environ.get("RATE_LIMIT_PER_MINUTE", "0"))
+
+
+class RateLimitMiddleware:
+    """
+    Cap how often a client IP can hit the processing endpoints.
+    
+    Runs before the request body is received, so a client over its limit is
+    turned away without its upload being parsed or spooled to disk. Counters
+    live in the file store, so all workers share them when Redis is used.
+    """
+    
+    def __init__(self, app, limit: int):
+        self.app = app
+        self.limit = limit
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or self.limit <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        if await file_store.increment(client_ip, 60) > self.limit:
+            response = JSONResponse(
+                {"detail": "Too many requests. Please try again in a minute."},
+                status_code=429,
+                headers={"Retry-After": "60"}
+            )
+            await response(scope, receive, send)
+            return
+        
+        await self.app(scope, receive, send)
+
+
+# Added before CORS so 413 and 429 responses still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+app.add_middleware(RateLimitMiddleware, limit=RATE_LIMIT_PER_MINUTE)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -31,66 +161,448 @@ app.add_middleware(
 
 # Create uploads directory if it doesn't exist
 UPLOADS_DIR = "uploads"
-if not os.path.exists(UPLOADS_DIR):
-    os.makedirs(UPLOADS_DIR)
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+# Joined once so per-request paths are a plain concatenation
+UPLOADS_PREFIX = os.path.join(UPLOADS_DIR, "")
+
+# Stored files are per-user documents, so only the client may cache them
+DOWNLOAD_CACHE_CONTROL = "private, max-age=3600"
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Magic bytes each upload type must start with, checked before anything is written
+UPLOAD_SIGNATURES = {
+    ".pdf": b"%PDF-",
+    ".pptx": b"PK\x03\x04",
+    ".jpg": b"\xff\xd8\xff",
+}
+
+# Page rendering holds whole documents in memory; cap how many run at once.
+# The semaphore is per web worker, so the server-wide cap is MAX_CONVERSIONS * WORKERS
+CONVERSION_SEMAPHORE = asyncio.Semaphore(int(os.environ.get("MAX_CONVERSIONS", "2")))
+
+# Registry of stored files: Redis when REDIS_URL is set, otherwise in-process
+file_store = create_file_store()
+
+# CPU-bound conversions run in worker processes so they bypass the GIL
+conversion_executor = create_executor()
+
+# How long stored files stay downloadable
+FILE_TTL_SECONDS = 24 * 60 * 60
+FILE_TTL = timedelta(seconds=FILE_TTL_SECONDS)
+
+# How often expired files are swept from UPLOADS_DIR
+CLEANUP_INTERVAL_SECONDS = int(os.environ.get("CLEANUP_INTERVAL_SECONDS", "300"))
+
+# Temporary uploads older than this were left behind by interrupted requests
+STALE_UPLOAD_SECONDS = 60 * 60
+
+# Content-Type sent for each stored file's extension
+DOWNLOAD_MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# Internal nginx location aliasing UPLOADS_DIR, e.g. "/_protected/". When set,
+# downloads are handed to nginx via X-Accel-Redirect instead of being read by
+# the app. The location must be marked `internal` so it can't be fetched directly.
+ACCEL_REDIRECT_PREFIX = os.environ.get("ACCEL_REDIRECT_PREFIX", "")
+
+# Most file IDs a single /delete-batch call may name
+MAX_BATCH_DELETE = 100
+
+# File IDs are generated server-side; anything else is rejected before lookup
+_is_valid_file_id = re.compile(r"\A[A-Za-z0-9_-]{1,64}\Z").match
+
+
+def _json_bytes(content: Any) -> bytes:
+    """Serialize content once, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# The root, health and delete responses never change, so they are serialized once
+ROOT_PAYLOAD = _json_bytes({
+    "message": "PDF Unlock API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "endpoints": {
+        "unlock_pdf": "POST /unlock-pdf",
+        "unlock_with_password": "POST /unlock-with-password",
+        "lock_pdf": "POST /lock-pdf",
+        "compress_pdf": "POST /compress-pdf",
+        "pdf_to_powerpoint": "POST /pdf-to-powerpoint",
+        "powerpoint_to_pdf": "POST /powerpoint-to-pdf",
+        "jpg_to_pdf": "POST /jpg-to-pdf",
+        "pdf_to_jpg": "POST /pdf-to-jpg",
+        "download_pdf": "GET /download-pdf/{file_id}",
+        "delete_pdf": "DELETE /download-pdf/{file_id}",
+        "delete_batch": "POST /delete-batch",
+        "debug_files": "GET /debug/files"
+    },
+    "workflow": {
+        "step1": "Upload PDF to /unlock-pdf for automatic unlock attempt",
+        "step2": "If automatic unlock fails, use /unlock-with-password with file_id and password",
+        "step3": "Download unlocked PDF using the provided download URL"
+    },
+    "features": {
+        "unlock": "Automatically unlock password-protected PDFs",
+        "lock": "Add password protection to PDFs",
+        "compress": "Reduce PDF file size with compression levels (low, medium, high)",
+        "convert": "Convert PDF to PowerPoint, PowerPoint to PDF, JPG to PDF, and PDF to JPG"
+    }
+})
+HEALTH_PAYLOAD = _json_bytes({
+    "status": "healthy",
+    "version": "1.0.0",
+    "service": "PDF Unlock API"
+})
+DELETE_OK_PAYLOAD = _json_bytes({
+    "success": True,
+    "message": "File deleted successfully"
+})
+
+# Proxies may cache the API description; health responses stay uncached so
+# probes always reach a live worker
+ROOT_HEADERS = {"Cache-Control": "public, max-age=60"}
+
+
+def _remove_expired_files(registered_ids: Set[str]) -> int:
+    """
+    Delete stored files older than FILE_TTL_SECONDS and abandoned temporary uploads.
+    
+    Age is judged by mtime, which is set when a file is stored, so files are
+    removed even if nobody ever requests them again. Files still in the
+    registry are kept whatever their mtime: a cached result is hardlinked and
+    shares the original's mtime, but stays downloadable for its own TTL.
+    
+    Args:
+        registered_ids: File IDs currently in the registry
+        
+    Returns:
+        Number of files removed
+    """
+    now = time.time()
+    upload_cutoff = now - STALE_UPLOAD_SECONDS
+    file_cutoff = now - FILE_TTL_SECONDS
+    removed = 0
+    with os.scandir(UPLOADS_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith("upload_"):
+                cutoff = upload_cutoff
+            elif os.path.splitext(entry.name)[0] in registered_ids:
+                continue
+            else:
+                cutoff = file_cutoff
+            try:
+                # is_file() comes from the directory listing; stat() is the only syscall
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+async def _cleanup_loop() -> None:
+    """Periodically drop expired registry entries and their files."""
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        try:
+            await file_store.purge_expired()
+            registered_ids = set(await file_store.file_ids())
+            removed = await asyncio.to_thread(_remove_expired_files, registered_ids)
+            if removed:
+                logger.info("Removed %s expired file(s)", removed)
+        except Exception:
+            logger.exception("Expired file cleanup failed")
+
+
+def _has_signature(extension: str, head: bytes) -> bool:
+    """Check the first bytes of an upload against UPLOAD_SIGNATURES."""
+    signature = UPLOAD_SIGNATURES[extension]
+    if extension == ".pdf":
+        # PDF readers accept a header anywhere in the first KiB
+        return signature in head[:1024]
+    return head.startswith(signature)
+
+
+def _save_upload(upload: UploadFile, extension: str) -> Tuple[str, str]:
+    """
+    Copy an upload to a new file in UPLOADS_DIR chunk by chunk.
+    
+    Returns:
+        Tuple of (upload_path, sha256_hexdigest); the digest is computed
+        from the same chunks so the upload is only read once
+        
+    Raises:
+        HTTPException: 415 if the content doesn't start with the magic
+            bytes for extension
+    """
+    upload.file.seek(0)
+    chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+    if not _has_signature(extension, chunk):
+        raise HTTPException(
+            status_code=415,
+            detail=f"File content is not a valid {extension[1:].upper()} file"
+        )
+    
+    upload_path = UPLOADS_PREFIX + f"upload_{secrets.token_hex(16)}{extension}"
+    digest = hashlib.sha256()
+    with open(upload_path, "wb") as f:
+        while chunk:
+            digest.update(chunk)
+            f.write(chunk)
+            chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+    return upload_path, digest.hexdigest()
+
+
+async def _store_artifact(
+    request: Request,
+    file_id: str,
+    file_path: str,
+    filename: str,
+    file_size: int,
+    **extra: Any
+) -> dict:
+    """
+    Register a stored file and build the response fields shared by every endpoint.
+    
+    Args:
+        request: Current request, used to build an absolute download URL
+        file_id: ID the file is downloaded under
+        file_path: Location of the file in UPLOADS_DIR
+        filename: Filename offered to the client on download
+        file_size: Size of the stored file in bytes
+        **extra: Endpoint-specific metadata, stored and echoed in the response
+        
+    Returns:
+        Dict with download_url, filename, file_size, expires_at, file_id and extra
+    """
+    expires_at = (datetime.now(timezone.utc) + FILE_TTL).isoformat()
+    await file_store.set(file_id, {
+        "filename": filename,
+        "file_path": file_path,
+        "expires_at": expires_at,
+        "file_size": file_size,
+        **extra
+    }, FILE_TTL_SECONDS)
+    
+    # Resolved against the request's host and scheme, so links work behind proxies
+    download_url = str(request.url_for("download_pdf", file_id=file_id))
+    logger.debug("Stored %s, download URL: %s", file_id, download_url)
+    
+    return {
+        "download_url": download_url,
+        "filename": filename,
+        "file_size": file_size,
+        "expires_at": expires_at,
+        "file_id": file_id,
+        **extra
+    }
+
+
+def _link_or_copy(source_path: str, file_path: str) -> None:
+    """
+    Give file_path the contents of source_path without copying where possible.
+    
+    A hardlink costs no I/O; copyfile (which uses sendfile on Linux) covers
+    filesystems without hardlink support. The link shares the original's
+    inode and mtime, which is left alone so the original's ETag doesn't
+    change; the cleanup sweep skips registered files, so the link isn't
+    removed early for looking old.
+    """
+    try:
+        os.link(source_path, file_path)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(source_path, file_path)
+
+
+async def _reuse_cached_result(cache_key: str, file_path: str) -> Optional[Tuple[str, int]]:
+    """
+    Link or copy a previously converted result to file_path if one is cached.
+    
+    Args:
+        cache_key: Conversion name, upload digest, options and filename
+        file_path: Where the new stored file should be written
+        
+    Returns:
+        Tuple of (filename, file_size) on a hit, None on a miss
+    """
+    cached_file_id = await file_store.cache_get(cache_key)
+    if cached_file_id is None:
+        return None
+    
+    cached_info = await file_store.get(cached_file_id)
+    if cached_info is None:
+        return None
+    
+    # Each file ID gets its own directory entry so deleting one doesn't break the other
+    try:
+        await asyncio.to_thread(_link_or_copy, cached_info["file_path"], file_path)
+    except FileNotFoundError:
+        return None
+    
+    return cached_info["filename"], cached_info["file_size"]
+
+
+async def _save_uploads(uploads: List[UploadFile], extension: str) -> Tuple[List[str], str]:
+    """
+    Stream several uploads to disk concurrently.
+    
+    If any upload is rejected, the ones already written are removed before
+    the error is raised.
+    
+    Returns:
+        Tuple of (upload_paths, digest); the digest of a single upload is its
+        own SHA-256, several uploads get a digest of their digests in order
+    """
+    saved = await asyncio.gather(
+        *(asyncio.to_thread(_save_upload, upload, extension) for upload in uploads),
+        return_exceptions=True
+    )
+    errors = [result for result in saved if isinstance(result, BaseException)]
+    if errors:
+        await asyncio.gather(*(
+            asyncio.to_thread(remove_file, result[0])
+            for result in saved if not isinstance(result, BaseException)
+        ))
+        raise errors[0]
+    
+    upload_paths = [upload_path for upload_path, _ in saved]
+    digests = [digest for _, digest in saved]
+    if len(digests) == 1:
+        return upload_paths, digests[0]
+    return upload_paths, hashlib.sha256("".join(digests).encode()).hexdigest()
+
+
+async def _run_conversion(
+    request: Request,
+    uploads: Union[UploadFile, List[UploadFile]],
+    input_extension: str,
+    output_extension: str,
+    processor_fn: Callable,
+    processor_args: tuple,
+    error_detail: str,
+    cacheable: bool = True,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **extra: Any
+) -> dict:
+    """
+    Run a PDFProcessor conversion on uploaded files and register the result.
+    
+    The uploads are streamed to disk, processor_fn runs in the conversion pool
+    as processor_fn(input, output_path, filename, *processor_args), and the
+    output is stored under a new file ID. The temporary uploads are always
+    removed afterwards.
+    
+    Args:
+        request: Current request, used to build the download URL
+        uploads: A single upload, or a list whose paths are passed on as a list
+        input_extension: Extension the uploads are saved with
+        output_extension: Extension of the stored result
+        processor_fn: PDFProcessor method to run
+        processor_args: Options passed after the filename; part of the cache key
+        error_detail: Prefix of the 500 detail for unexpected errors
+        cacheable: Whether identical uploads with the same options may reuse a result
+        semaphore: Optional semaphore bounding concurrent runs of this conversion
+        **extra: Endpoint-specific metadata, stored and echoed in the response
+        
+    Returns:
+        The shared response fields from _store_artifact
+        
+    Raises:
+        HTTPException: If an upload is rejected or the conversion fails
+    """
+    upload_list = uploads if isinstance(uploads, list) else [uploads]
+    source_filename = upload_list[0].filename
+    upload_paths, upload_digest = await _save_uploads(upload_list, input_extension)
+    
+    try:
+        logger.debug("Running %s for file: %s", processor_fn.__name__, source_filename)
+        
+        # The processor writes its result straight to the stored file
+        file_id = secrets.token_urlsafe(16)
+        file_path = UPLOADS_PREFIX + file_id + output_extension
+        
+        # Identical uploads with the same options reuse the earlier result
+        cache_key = None
+        cached_result = None
+        if cacheable:
+            cache_key = ":".join(
+                [processor_fn.__name__, upload_digest, *map(str, processor_args), source_filename]
+            )
+            cached_result = await _reuse_cached_result(cache_key, file_path)
+        
+        if cached_result is not None:
+            filename, file_size = cached_result
+        else:
+            processor_input = upload_paths if isinstance(uploads, list) else upload_paths[0]
+            async with semaphore if semaphore is not None else nullcontext():
+                filename, file_size = await run_in_executor(
+                    conversion_executor,
+                    processor_fn,
+                    processor_input, file_path, source_filename, *processor_args
+                )
+        
+        logger.debug("Saved %s bytes to: %s", file_size, file_path)
+        
+        # Register the file; it expires after FILE_TTL_SECONDS
+        artifact = await _store_artifact(
+            request, file_id, file_path, filename, file_size, **extra
+        )
+        if cache_key is not None:
+            await file_store.cache_set(cache_key, file_id, FILE_TTL_SECONDS)
+        
+        return artifact
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in %s", processor_fn.__name__)
+        raise HTTPException(
+            status_code=500,
+            detail=f"{error_detail}: {str(e)}"
+        )
+    finally:
+        await asyncio.gather(
+            *(asyncio.to_thread(remove_file, upload_path) for upload_path in upload_paths)
+        )
 
-# Store for temporary PDF files (in production, use Redis or database)
-temp_pdfs = {}
 
 @app.get("/")
 async def root():
     """Root endpoint."""
-    return {
-        "message": "PDF Unlock API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "endpoints": {
-            "unlock_pdf": "POST /unlock-pdf",
-            "unlock_with_password": "POST /unlock-with-password",
-            "lock_pdf": "POST /lock-pdf",
-            "compress_pdf": "POST /compress-pdf",
-            "pdf_to_powerpoint": "POST /pdf-to-powerpoint",
-            "powerpoint_to_pdf": "POST /powerpoint-to-pdf",
-            "jpg_to_pdf": "POST /jpg-to-pdf",
-            "pdf_to_jpg": "POST /pdf-to-jpg",
-            "download_pdf": "GET /download-pdf/{file_id}",
-            "delete_pdf": "DELETE /download-pdf/{file_id}",
-            "debug_files": "GET /debug/files"
-        },
-        "workflow": {
-            "step1": "Upload PDF to /unlock-pdf for automatic unlock attempt",
-            "step2": "If automatic unlock fails, use /unlock-with-password with file_id and password",
-            "step3": "Download unlocked PDF using the provided download URL"
-        },
-        "features": {
-            "unlock": "Automatically unlock password-protected PDFs",
-            "lock": "Add password protection to PDFs",
-            "compress": "Reduce PDF file size with compression levels (low, medium, high)",
-            "convert": "Convert PDF to PowerPoint, PowerPoint to PDF, JPG to PDF, and PDF to JPG"
-        }
-    }
+    return Response(ROOT_PAYLOAD, media_type="application/json", headers=ROOT_HEADERS)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "version": "1.0.0",
-        "service": "PDF Unlock API"
-    }
+    return Response(HEALTH_PAYLOAD, media_type="application/json")
 
 @app.get("/debug/files")
-async def debug_files():
-    """Debug endpoint to see stored files."""
+async def debug_files(count_only: bool = False):
+    """Debug endpoint to see stored files. Pass count_only=true to skip the ID list."""
+    if count_only:
+        return {"file_count": await file_store.count()}
+    stored_files = await file_store.file_ids()
     return {
-        "stored_files": list(temp_pdfs.keys()),
-        "file_count": len(temp_pdfs),
+        "stored_files": stored_files,
+        "file_count": len(stored_files),
         "uploads_dir": UPLOADS_DIR,
         "uploads_dir_exists": os.path.exists(UPLOADS_DIR)
     }
 
 @app.post("/unlock-pdf")
 async def unlock_pdf(
+    request: Request,
     pdf_file: UploadFile = File(..., description="Password-protected PDF file to unlock")
 ):
     """
@@ -110,118 +622,90 @@ async def unlock_pdf(
     # Validate the uploaded file
     PDFProcessor.validate_pdf_file(pdf_file)
     
+    # Stream the upload to disk instead of holding it in memory
+    upload_path, _ = await asyncio.to_thread(_save_upload, pdf_file, ".pdf")
+    
     try:
-        print(f"DEBUG: Starting automatic unlock for file: {pdf_file.filename}")
-        
-        # Unlock the PDF automatically
-        unlocked_pdf_content, filename = PDFProcessor.unlock_pdf_automatically(pdf_file)
-        
-        print(f"DEBUG: Successfully unlocked PDF, content size: {len(unlocked_pdf_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the unlocked PDF to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-        with open(file_path, "wb") as f:
-            f.write(unlocked_pdf_content)
-        
-        print(f"DEBUG: Saved unlocked PDF to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(unlocked_pdf_content),
-            "unlock_method": "automatic"
-        }
-        
-        # Generate download URL - ensure no encoding issues
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        print(f"DEBUG: Stored in temp_pdfs: {file_id in temp_pdfs}")
-        
-        return {
-            "success": True,
-            "message": "PDF unlocked successfully - no password required to open",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(unlocked_pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "unlock_method": "automatic",
-            "passwordRequired": False,
-            "note": "The downloaded PDF should open without asking for a password"
-        }
-        
-    except HTTPException as http_error:
-        print(f"DEBUG: Automatic unlock failed: {http_error.detail}")
-        # If automatic unlock fails, save the original PDF and return it
-        # This allows the frontend to then ask for a password and call unlock-with-password
         try:
-            # Read the original file content
-            pdf_file.file.seek(0)  # Reset file pointer
-            original_content = pdf_file.file.read()
+            logger.debug("Starting automatic unlock for file: %s", pdf_file.filename)
             
             # Generate unique ID for the file
-            file_id = str(uuid.uuid4())
+            file_id = secrets.token_urlsafe(16)
             
-            # Save the original PDF to disk
-            file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-            with open(file_path, "wb") as f:
-                f.write(original_content)
+            # The processor writes the unlocked PDF straight to disk
+            file_path = UPLOADS_PREFIX + file_id + ".pdf"
             
-            # Store file info with expiration (24 hours)
-            expiration_time = datetime.now() + timedelta(hours=24)
-            temp_pdfs[file_id] = {
-                "filename": f"original_{pdf_file.filename}",
-                "file_path": file_path,
-                "expires_at": expiration_time,
-                "file_size": len(original_content),
-                "unlock_method": "failed_automatic",
-                "original_filename": pdf_file.filename
-            }
+            # Unlock the PDF automatically
+            filename, file_size = await run_in_executor(
+                conversion_executor,
+                PDFProcessor.unlock_pdf_automatically,
+                upload_path, file_path, pdf_file.filename
+            )
             
-            # Generate download URL - ensure no encoding issues
-            download_url = f"http://localhost:8000/download-pdf/{file_id}"
+            logger.debug("Successfully unlocked PDF, file size: %s bytes", file_size)
             
-            print(f"DEBUG: Generated file_id (fallback): {file_id}")
-            print(f"DEBUG: Download URL (fallback): {download_url}")
-            print(f"DEBUG: Stored in temp_pdfs (fallback): {file_id in temp_pdfs}")
+            logger.debug("Saved unlocked PDF to: %s", file_path)
+            
+            # Register the file; it expires after FILE_TTL_SECONDS
+            artifact = await _store_artifact(
+                request, file_id, file_path, filename, file_size,
+                unlock_method="automatic"
+            )
             
             return {
-                "success": False,
-                "message": "Automatic unlock failed - password required",
-                "download_url": download_url,
-                "filename": f"original_{pdf_file.filename}",
-                "file_size": len(original_content),
-                "expires_at": expiration_time.isoformat(),
-                "file_id": file_id,
-                "unlock_method": "failed_automatic",
-                "original_filename": pdf_file.filename,
-                "passwordRequired": True,
-                "note": "Automatic unlock failed. Use the unlock-with-password endpoint with this file_id and the correct password.",
-                "next_step": "Call /unlock-with-password endpoint with file_id and password"
+                "success": True,
+                "message": "PDF unlocked successfully - no password required to open",
+                **artifact,
+                "passwordRequired": False,
+                "note": "The downloaded PDF should open without asking for a password"
             }
             
-        except Exception as fallback_error:
+        except HTTPException as http_error:
+            logger.debug("Automatic unlock failed: %s", http_error.detail)
+            # If automatic unlock fails, save the original PDF and return it
+            # This allows the frontend to then ask for a password and call unlock-with-password
+            try:
+                # Generate unique ID for the file
+                file_id = secrets.token_urlsafe(16)
+                
+                # Keep the streamed original as the stored PDF
+                file_path = UPLOADS_PREFIX + file_id + ".pdf"
+                await asyncio.to_thread(os.replace, upload_path, file_path)
+                original_size = os.path.getsize(file_path)
+                
+                # Register the file; it expires after FILE_TTL_SECONDS
+                artifact = await _store_artifact(
+                    request, file_id, file_path, f"original_{pdf_file.filename}", original_size,
+                    unlock_method="failed_automatic",
+                    original_filename=pdf_file.filename
+                )
+                
+                return {
+                    "success": False,
+                    "message": "Automatic unlock failed - password required",
+                    **artifact,
+                    "passwordRequired": True,
+                    "note": "Automatic unlock failed. Use the unlock-with-password endpoint with this file_id and the correct password.",
+                    "next_step": "Call /unlock-with-password endpoint with file_id and password"
+                }
+                
+            except Exception as fallback_error:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Error processing PDF: {str(http_error.detail)}. Fallback also failed: {str(fallback_error)}"
+                )
+        except Exception as e:
+            logger.exception("Unexpected error in automatic unlock")
             raise HTTPException(
                 status_code=500,
-                detail=f"Error processing PDF: {str(http_error.detail)}. Fallback also failed: {str(fallback_error)}"
+                detail=f"Error processing PDF: {str(e)}"
             )
-    except Exception as e:
-        print(f"DEBUG: Unexpected error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing PDF: {str(e)}"
-        )
+    finally:
+        await asyncio.to_thread(remove_file, upload_path)
 
 @app.post("/unlock-with-password")
 async def unlock_with_password(
+    request: Request,
     file_id: str = Form(..., description="File ID from previous unlock attempt"),
     password: str = Form(..., description="Password to unlock the PDF")
 ):
@@ -239,98 +723,58 @@ async def unlock_with_password(
     """
     from app.utils.pdf_processor import PDFProcessor
     
-    # Decode URL-encoded file_id if needed
-    decoded_file_id = unquote(file_id)
+    # File IDs are URL-safe tokens, so they never need decoding
+    if not _is_valid_file_id(file_id):
+        raise HTTPException(status_code=400, detail="Invalid file ID")
     
-    # Try both original and decoded file_id
-    actual_file_id = None
-    if file_id in temp_pdfs:
-        actual_file_id = file_id
-    elif decoded_file_id in temp_pdfs:
-        actual_file_id = decoded_file_id
-    else:
+    file_info = await file_store.get(file_id)
+    if file_info is None:
         raise HTTPException(status_code=404, detail="File not found or expired")
     
-    file_info = temp_pdfs[actual_file_id]
-    
-    # Check if file has expired
-    if datetime.now() > file_info["expires_at"]:
-        # Remove expired file
-        if os.path.exists(file_info["file_path"]):
-            os.remove(file_info["file_path"])
-        del temp_pdfs[actual_file_id]
-        raise HTTPException(status_code=410, detail="File has expired")
-    
-    # Check if file exists on disk
-    if not os.path.exists(file_info["file_path"]):
-        del temp_pdfs[actual_file_id]
-        raise HTTPException(status_code=404, detail="File not found on disk")
-    
     try:
-        print(f"DEBUG: Attempting password unlock for file_id: {actual_file_id}")
-        
-        # Read the original PDF file
-        with open(file_info["file_path"], "rb") as f:
-            pdf_content = f.read()
-        
-        # Create a temporary UploadFile object for the PDF processor
-        from fastapi import UploadFile
-        import io
-        
-        temp_file = UploadFile(
-            filename=file_info.get("original_filename", "temp.pdf"),
-            file=io.BytesIO(pdf_content)
-        )
-        
-        # Unlock the PDF with password
-        unlocked_pdf_content, filename = PDFProcessor.unlock_pdf_with_password(temp_file, password)
-        
-        print(f"DEBUG: Successfully unlocked PDF with password, content size: {len(unlocked_pdf_content)} bytes")
+        logger.debug("Attempting password unlock for file_id: %s", file_id)
         
         # Generate new unique ID for the unlocked file
-        new_file_id = str(uuid.uuid4())
-        
-        # Save the unlocked PDF to disk
-        new_file_path = os.path.join(UPLOADS_DIR, f"{new_file_id}.pdf")
-        with open(new_file_path, "wb") as f:
-            f.write(unlocked_pdf_content)
+        new_file_id = secrets.token_urlsafe(16)
+        
+        # The processor reads the stored PDF and writes the unlocked copy to disk
+        new_file_path = UPLOADS_PREFIX + new_file_id + ".pdf"
+        filename, file_size = await run_in_executor(
+            conversion_executor,
+            PDFProcessor.unlock_pdf_with_password,
+            file_info["file_path"],
+            new_file_path,
+            file_info.get("original_filename", "temp.pdf"),
+            password
+        )
         
-        print(f"DEBUG: Saved unlocked PDF to: {new_file_path}")
+        logger.debug("Successfully unlocked PDF with password, file size: %s bytes", file_size)
         
-        # Store new file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[new_file_id] = {
-            "filename": filename,
-            "file_path": new_file_path,
-            "expires_at": expiration_time,
-            "file_size": len(unlocked_pdf_content),
-            "unlock_method": "password"
-        }
+        logger.debug("Saved unlocked PDF to: %s", new_file_path)
         
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{new_file_id}"
-        
-        print(f"DEBUG: Generated new file_id: {new_file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
+        # Register the file; it expires after FILE_TTL_SECONDS
+        artifact = await _store_artifact(
+            request, new_file_id, new_file_path, filename, file_size,
+            unlock_method="password"
+        )
         
         return {
             "success": True,
             "message": "PDF unlocked successfully with password - no password required to open",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(unlocked_pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": new_file_id,
-            "unlock_method": "password",
+            **artifact,
             "passwordRequired": False,
             "note": "The downloaded PDF should open without asking for a password"
         }
         
+    except FileNotFoundError:
+        # The stored PDF was removed after it was registered
+        await file_store.delete(file_id)
+        raise HTTPException(status_code=404, detail="File not found on disk")
     except HTTPException as http_error:
-        print(f"DEBUG: Password unlock failed: {http_error.detail}")
+        logger.debug("Password unlock failed: %s", http_error.detail)
         raise http_error
     except Exception as e:
-        print(f"DEBUG: Unexpected error in password unlock: {str(e)}")
+        logger.exception("Unexpected error in password unlock")
         raise HTTPException(
             status_code=500,
             detail=f"Error unlocking PDF with password: {str(e)}"
@@ -338,6 +782,7 @@ async def unlock_with_password(
 
 @app.post("/lock-pdf")
 async def lock_pdf(
+    request: Request,
     pdf_file: UploadFile = File(..., description="PDF file to password-protect"),
     password: str = Form(..., description="Password to protect the PDF")
 ):
@@ -358,52 +803,23 @@ async def lock_pdf(
     # Validate the uploaded file
     PDFProcessor.validate_pdf_file(pdf_file)
     
-    try:
-        # Lock the PDF
-        locked_pdf_content, filename = PDFProcessor.lock_pdf_with_password(
-            pdf_file, password
-        )
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the locked PDF to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-        with open(file_path, "wb") as f:
-            f.write(locked_pdf_content)
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(locked_pdf_content)
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        return {
-            "success": True,
-            "message": "PDF locked successfully",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(locked_pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing PDF: {str(e)}"
-        )
+    # Never cache: the result depends on the password
+    artifact = await _run_conversion(
+        request, pdf_file, ".pdf", ".pdf",
+        PDFProcessor.lock_pdf_with_password, (password,),
+        "Error processing PDF",
+        cacheable=False
+    )
+    
+    return {
+        "success": True,
+        "message": "PDF locked successfully",
+        **artifact
+    }
 
 @app.post("/compress-pdf")
 async def compress_pdf(
+    request: Request,
     pdf_file: UploadFile = File(..., description="PDF file to compress"),
     compression_level: str = Form("medium", description="Compression level: low, medium, high")
 ):
@@ -432,63 +848,23 @@ async def compress_pdf(
             detail=f"Invalid compression level. Must be one of: {', '.join(valid_levels)}"
         )
     
-    try:
-        print(f"DEBUG: Starting PDF compression for file: {pdf_file.filename} with level: {compression_level}")
-        
-        # Compress the PDF
-        compressed_pdf_content, filename = PDFProcessor.compress_pdf(pdf_file, compression_level)
-        
-        print(f"DEBUG: Successfully compressed PDF, content size: {len(compressed_pdf_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the compressed PDF to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-        with open(file_path, "wb") as f:
-            f.write(compressed_pdf_content)
-        
-        print(f"DEBUG: Saved compressed PDF to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(compressed_pdf_content),
-            "compression_level": compression_level
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        
-        return {
-            "success": True,
-            "message": f"PDF compressed successfully with {compression_level} compression",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(compressed_pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "compression_level": compression_level,
-            "note": "The compressed PDF is ready for download"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in compression: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error compressing PDF: {str(e)}"
-        )
+    artifact = await _run_conversion(
+        request, pdf_file, ".pdf", ".pdf",
+        PDFProcessor.compress_pdf, (compression_level,),
+        "Error compressing PDF",
+        compression_level=compression_level
+    )
+    
+    return {
+        "success": True,
+        "message": f"PDF compressed successfully with {compression_level} compression",
+        **artifact,
+        "note": "The compressed PDF is ready for download"
+    }
 
 @app.post("/pdf-to-powerpoint")
 async def pdf_to_powerpoint(
+    request: Request,
     pdf_file: UploadFile = File(..., description="PDF file to convert to PowerPoint")
 ):
     """
@@ -507,63 +883,25 @@ async def pdf_to_powerpoint(
     # Validate the uploaded file
     PDFProcessor.validate_pdf_file(pdf_file)
     
-    try:
-        print(f"DEBUG: Starting PDF to PowerPoint conversion for file: {pdf_file.filename}")
-        
-        # Convert PDF to PowerPoint
-        powerpoint_content, filename = PDFProcessor.pdf_to_powerpoint(pdf_file)
-        
-        print(f"DEBUG: Successfully converted PDF to PowerPoint, content size: {len(powerpoint_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the PowerPoint file to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pptx")
-        with open(file_path, "wb") as f:
-            f.write(powerpoint_content)
-        
-        print(f"DEBUG: Saved PowerPoint file to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(powerpoint_content),
-            "conversion_type": "pdf_to_powerpoint"
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        
-        return {
-            "success": True,
-            "message": "PDF successfully converted to PowerPoint",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(powerpoint_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "conversion_type": "pdf_to_powerpoint",
-            "note": "The PowerPoint file is ready for download"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in PDF to PowerPoint conversion: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error converting PDF to PowerPoint: {str(e)}"
-        )
+    # Page rendering is memory-heavy, so only a bounded number run at a time
+    artifact = await _run_conversion(
+        request, pdf_file, ".pdf", ".pptx",
+        PDFProcessor.pdf_to_powerpoint, (),
+        "Error converting PDF to PowerPoint",
+        semaphore=CONVERSION_SEMAPHORE,
+        conversion_type="pdf_to_powerpoint"
+    )
+    
+    return {
+        "success": True,
+        "message": "PDF successfully converted to PowerPoint",
+        **artifact,
+        "note": "The PowerPoint file is ready for download"
+    }
 
 @app.post("/powerpoint-to-pdf")
 async def powerpoint_to_pdf(
+    request: Request,
     pptx_file: UploadFile = File(..., description="PowerPoint file to convert to PDF")
 ):
     """
@@ -582,63 +920,23 @@ async def powerpoint_to_pdf(
     # Validate the uploaded file
     PDFProcessor.validate_powerpoint_file(pptx_file)
     
-    try:
-        print(f"DEBUG: Starting PowerPoint to PDF conversion for file: {pptx_file.filename}")
-        
-        # Convert PowerPoint to PDF
-        pdf_content, filename = PDFProcessor.powerpoint_to_pdf(pptx_file)
-        
-        print(f"DEBUG: Successfully converted PowerPoint to PDF, content size: {len(pdf_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the PDF file to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-        with open(file_path, "wb") as f:
-            f.write(pdf_content)
-        
-        print(f"DEBUG: Saved PDF file to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(pdf_content),
-            "conversion_type": "powerpoint_to_pdf"
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        
-        return {
-            "success": True,
-            "message": "PowerPoint successfully converted to PDF",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "conversion_type": "powerpoint_to_pdf",
-            "note": "The PDF file is ready for download"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in PowerPoint to PDF conversion: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error converting PowerPoint to PDF: {str(e)}"
-        )
+    artifact = await _run_conversion(
+        request, pptx_file, ".pptx", ".pdf",
+        PDFProcessor.powerpoint_to_pdf, (),
+        "Error converting PowerPoint to PDF",
+        conversion_type="powerpoint_to_pdf"
+    )
+    
+    return {
+        "success": True,
+        "message": "PowerPoint successfully converted to PDF",
+        **artifact,
+        "note": "The PDF file is ready for download"
+    }
 
 @app.post("/jpg-to-pdf")
 async def jpg_to_pdf(
+    request: Request,
     jpg_files: List[UploadFile] = File(..., description="JPG image files to convert to PDF"),
     page_orientation: str = Form("portrait", description="Page orientation: 'portrait' or 'landscape'"),
     page_size: str = Form("a4", description="Page size: 'a4', 'us_letter', or 'fit'"),
@@ -666,80 +964,30 @@ async def jpg_to_pdf(
     for jpg_file in jpg_files:
         PDFProcessor.validate_jpg_file(jpg_file)
     
-    try:
-        print(f"DEBUG: Starting JPG to PDF conversion for {len(jpg_files)} files")
-        print(f"DEBUG: Options - Orientation: {page_orientation}, Size: {page_size}, Margin: {margin}, Merge: {merge_all}")
-        
-        # Convert JPG to PDF
-        pdf_content, filename = PDFProcessor.jpg_to_pdf(
-            jpg_files, page_orientation, page_size, margin, merge_all
-        )
-        
-        print(f"DEBUG: Successfully converted JPG to PDF, content size: {len(pdf_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the PDF file to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.pdf")
-        with open(file_path, "wb") as f:
-            f.write(pdf_content)
-        
-        print(f"DEBUG: Saved PDF file to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(pdf_content),
-            "conversion_type": "jpg_to_pdf",
-            "options": {
-                "page_orientation": page_orientation,
-                "page_size": page_size,
-                "margin": margin,
-                "merge_all": merge_all,
-                "image_count": len(jpg_files)
-            }
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        
-        return {
-            "success": True,
-            "message": f"Successfully converted {len(jpg_files)} JPG image(s) to PDF",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(pdf_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "conversion_type": "jpg_to_pdf",
-            "options": {
-                "page_orientation": page_orientation,
-                "page_size": page_size,
-                "margin": margin,
-                "merge_all": merge_all,
-                "image_count": len(jpg_files)
-            },
-            "note": "The PDF file is ready for download"
+    artifact = await _run_conversion(
+        request, jpg_files, ".jpg", ".pdf",
+        PDFProcessor.jpg_to_pdf, (page_orientation, page_size, margin, merge_all),
+        "Error converting JPG to PDF",
+        conversion_type="jpg_to_pdf",
+        options={
+            "page_orientation": page_orientation,
+            "page_size": page_size,
+            "margin": margin,
+            "merge_all": merge_all,
+            "image_count": len(jpg_files)
         }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in JPG to PDF conversion: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error converting JPG to PDF: {str(e)}"
-        )
+    )
+    
+    return {
+        "success": True,
+        "message": f"Successfully converted {len(jpg_files)} JPG image(s) to PDF",
+        **artifact,
+        "note": "The PDF file is ready for download"
+    }
 
 @app.post("/pdf-to-jpg")
 async def pdf_to_jpg(
+    request: Request,
     pdf_file: UploadFile = File(..., description="PDF file to convert to JPG"),
     page_number: int = Form(1, description="Page number to convert (default: 1)")
 ):
@@ -767,116 +1015,91 @@ async def pdf_to_jpg(
             detail="Page number must be greater than 0"
         )
     
-    try:
-        print(f"DEBUG: Starting PDF to JPG conversion for file: {pdf_file.filename}, page: {page_number}")
-        
-        # Convert PDF to JPG
-        jpg_content, filename = PDFProcessor.pdf_to_jpg(pdf_file, page_number)
-        
-        print(f"DEBUG: Successfully converted PDF to JPG, content size: {len(jpg_content)} bytes")
-        
-        # Generate unique ID for the file
-        file_id = str(uuid.uuid4())
-        
-        # Save the JPG file to disk
-        file_path = os.path.join(UPLOADS_DIR, f"{file_id}.jpg")
-        with open(file_path, "wb") as f:
-            f.write(jpg_content)
-        
-        print(f"DEBUG: Saved JPG file to: {file_path}")
-        
-        # Store file info with expiration (24 hours)
-        expiration_time = datetime.now() + timedelta(hours=24)
-        temp_pdfs[file_id] = {
-            "filename": filename,
-            "file_path": file_path,
-            "expires_at": expiration_time,
-            "file_size": len(jpg_content),
-            "conversion_type": "pdf_to_jpg",
-            "page_number": page_number
-        }
-        
-        # Generate download URL
-        download_url = f"http://localhost:8000/download-pdf/{file_id}"
-        
-        print(f"DEBUG: Generated file_id: {file_id}")
-        print(f"DEBUG: Download URL: {download_url}")
-        
-        return {
-            "success": True,
-            "message": f"PDF page {page_number} successfully converted to JPG",
-            "download_url": download_url,
-            "filename": filename,
-            "file_size": len(jpg_content),
-            "expires_at": expiration_time.isoformat(),
-            "file_id": file_id,
-            "conversion_type": "pdf_to_jpg",
-            "page_number": page_number,
-            "note": "The JPG file is ready for download"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in PDF to JPG conversion: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error converting PDF to JPG: {str(e)}"
-        )
+    artifact = await _run_conversion(
+        request, pdf_file, ".pdf", ".jpg",
+        PDFProcessor.pdf_to_jpg, (page_number,),
+        "Error converting PDF to JPG",
+        conversion_type="pdf_to_jpg",
+        page_number=page_number
+    )
+    
+    return {
+        "success": True,
+        "message": f"PDF page {page_number} successfully converted to JPG",
+        **artifact,
+        "note": "The JPG file is ready for download"
+    }
 
-@app.get("/download-pdf/{file_id}")
-async def download_pdf(file_id: str):
+@app.get("/download-pdf/{file_id}", name="download_pdf")
+async def download_pdf(file_id: str, request: Request):
     """
     Download a PDF file by its ID.
     
     This endpoint allows downloading PDF files using the file ID
-    returned from the unlock-pdf or lock-pdf endpoints.
+    returned from the unlock-pdf or lock-pdf endpoints. Responses carry an
+    ETag, and a matching If-None-Match header gets an empty 304 response.
     
     - **file_id**: The unique identifier for the PDF file
     
     Returns:
     - **File**: The PDF file for download
     """
-    # Decode URL-encoded file_id if needed
-    decoded_file_id = unquote(file_id)
-    
-    print(f"DEBUG: Original file_id: {file_id}")
-    print(f"DEBUG: Decoded file_id: {decoded_file_id}")
-    print(f"DEBUG: Available file_ids: {list(temp_pdfs.keys())}")
-    print(f"DEBUG: Original in temp_pdfs: {file_id in temp_pdfs}")
-    print(f"DEBUG: Decoded in temp_pdfs: {decoded_file_id in temp_pdfs}")
-    
-    # Try both original and decoded file_id
-    actual_file_id = None
-    if file_id in temp_pdfs:
-        actual_file_id = file_id
-    elif decoded_file_id in temp_pdfs:
-        actual_file_id = decoded_file_id
-    else:
-        raise HTTPException(status_code=404, detail="File not found or expired")
+    # File IDs are URL-safe tokens, so they never need decoding
+    if not _is_valid_file_id(file_id):
+        raise HTTPException(status_code=400, detail="Invalid file ID")
     
-    file_info = temp_pdfs[actual_file_id]
+    logger.debug("Download requested for file_id: %s", file_id)
     
-    # Check if file has expired
-    if datetime.now() > file_info["expires_at"]:
-        # Remove expired file
-        if os.path.exists(file_info["file_path"]):
-            os.remove(file_info["file_path"])
-        del temp_pdfs[actual_file_id]
-        raise HTTPException(status_code=410, detail="File has expired")
+    file_info = await file_store.get(file_id)
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="File not found or expired")
     
-    # Check if file exists on disk
-    if not os.path.exists(file_info["file_path"]):
-        del temp_pdfs[actual_file_id]
+    # Stat the file once; FileResponse reuses the result instead of stat-ing again
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_info["file_path"])
+    except FileNotFoundError:
+        await file_store.delete(file_id)
         raise HTTPException(status_code=404, detail="File not found on disk")
     
+    # Let clients revalidate their cached copy without re-sending the body
+    etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    cache_headers = {"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=cache_headers)
+    
+    # The stored path always carries the real output extension; the display
+    # filename is derived from the upload and may not
+    media_type = DOWNLOAD_MEDIA_TYPES.get(
+        os.path.splitext(file_info["file_path"])[1], "application/octet-stream"
+    )
+    
+    # Behind nginx, let it send the file with sendfile() instead of the app
+    if ACCEL_REDIRECT_PREFIX:
+        quoted_filename = quote(file_info["filename"])
+        if quoted_filename != file_info["filename"]:
+            content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
+        else:
+            content_disposition = f'attachment; filename="{file_info["filename"]}"'
+        return Response(
+            media_type=media_type,
+            headers={
+                **cache_headers,
+                "Content-Disposition": content_disposition,
+                "X-Accel-Redirect": ACCEL_REDIRECT_PREFIX + os.path.basename(file_info["file_path"])
+            }
+        )
+    
     # Return the file for download
     return FileResponse(
         path=file_info["file_path"],
+        stat_result=stat_result,
+        headers=cache_headers,
         filename=file_info["filename"],
-        media_type="application/pdf" if file_info["filename"].endswith('.pdf') else 
-                  "image/jpeg" if file_info["filename"].endswith(('.jpg', '.jpeg')) else
-                  "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        media_type=media_type
     )
 
 @app.delete("/download-pdf/{file_id}")
@@ -891,30 +1114,76 @@ async def delete_pdf(file_id: str):
     Returns:
     - **JSON**: Success message
     """
-    # Decode URL-encoded file_id if needed
-    decoded_file_id = unquote(file_id)
+    # File IDs are URL-safe tokens, so they never need decoding
+    if not _is_valid_file_id(file_id):
+        raise HTTPException(status_code=400, detail="Invalid file ID")
     
-    # Try both original and decoded file_id
-    actual_file_id = None
-    if file_id in temp_pdfs:
-        actual_file_id = file_id
-    elif decoded_file_id in temp_pdfs:
-        actual_file_id = decoded_file_id
-    else:
+    # Remove from the registry
+    file_info = await file_store.delete(file_id)
+    if file_info is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = temp_pdfs[actual_file_id]
-    
     # Remove file from disk
-    if os.path.exists(file_info["file_path"]):
-        os.remove(file_info["file_path"])
+    await asyncio.to_thread(remove_file, file_info["file_path"])
+    
+    return Response(DELETE_OK_PAYLOAD, media_type="application/json")
+
+@app.post("/delete-batch")
+async def delete_batch(
+    file_ids: List[str] = Body(..., embed=True, description="File IDs to delete")
+):
+    """
+    Delete several files in a single request.
     
-    # Remove from memory
-    del temp_pdfs[actual_file_id]
+    Unknown IDs are reported back rather than failing the whole batch, and
+    the files on disk are removed concurrently. Files whose removal fails
+    are reported under failed; the cleanup sweep removes them later.
+    
+    - **file_ids**: The unique identifiers of the files to delete, at most MAX_BATCH_DELETE
+    
+    Returns:
+    - **JSON**: Deleted, not-found and failed file IDs
+    """
+    if len(file_ids) > MAX_BATCH_DELETE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_DELETE} file IDs can be deleted at once"
+        )
+    
+    # File IDs are URL-safe tokens; anything else never reaches the registry
+    file_ids = list(dict.fromkeys(file_ids))
+    invalid_ids = [file_id for file_id in file_ids if not _is_valid_file_id(file_id)]
+    if invalid_ids:
+        raise HTTPException(status_code=400, detail=f"Invalid file ID: {invalid_ids[0]}")
+    
+    # Remove from the registry in one batch
+    file_infos = await file_store.delete_many(file_ids)
+    not_found = [file_id for file_id, file_info in zip(file_ids, file_infos) if file_info is None]
+    removed = [
+        (file_id, file_info["file_path"])
+        for file_id, file_info in zip(file_ids, file_infos) if file_info is not None
+    ]
+    
+    # Remove files from disk
+    results = await asyncio.gather(
+        *(asyncio.to_thread(remove_file, file_path) for _, file_path in removed),
+        return_exceptions=True
+    )
+    deleted = []
+    failed = []
+    for (file_id, file_path), result in zip(removed, results):
+        if isinstance(result, BaseException):
+            logger.error("Failed to remove %s: %s", file_path, result)
+            failed.append(file_id)
+        else:
+            deleted.append(file_id)
     
     return {
-        "success": True,
-        "message": "File deleted successfully"
+        "success": not failed,
+        "message": f"Deleted {len(deleted)} file(s)",
+        "deleted": deleted,
+        "not_found": not_found,
+        "failed": failed
     }
 
 if __name__ == "__main__":
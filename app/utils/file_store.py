@@ -0,0 +1,261 @@
+"""
+Registry of stored files and their expiry times.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+def remove_file(file_path: str) -> None:
+    """Remove a stored file, ignoring files that are already gone."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_files(file_paths: List[str]) -> None:
+    """Remove several stored files; meant to run in a thread via asyncio.to_thread."""
+    for file_path in file_paths:
+        remove_file(file_path)
+
+
+class MemoryFileStore:
+    """
+    In-process file registry.
+
+    Entries are only visible to the worker that created them, so this store
+    is meant for development and single-worker deployments.
+    """
+
+    # Expired counters are swept once this many are held
+    MAX_COUNTERS = 10000
+
+    # Registering more files than this evicts the oldest ones, with their files;
+    # the conversion cache is capped at the same size
+    MAX_FILES = 10000
+
+    def __init__(self):
+        # Kept in registration order so the oldest file is evicted first
+        self._files: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # (expires_at, file_id) min-heap so purging only touches expired files;
+        # entries for deleted or re-registered IDs are skipped when popped, and
+        # the heap is rebuilt from _files once they outnumber the live ones
+        self._file_expiry: List[Tuple[float, str]] = []
+        # Kept in insertion order so the oldest cache entry is evicted first
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._counters: Dict[str, Tuple[float, int]] = {}
+
+    async def set(self, file_id: str, file_info: dict, ttl_seconds: int) -> None:
+        """Register a file that expires after ttl_seconds."""
+        expires_at = time.monotonic() + ttl_seconds
+        self._files[file_id] = (expires_at, file_info)
+        self._files.move_to_end(file_id)
+        heapq.heappush(self._file_expiry, (expires_at, file_id))
+        if len(self._file_expiry) > 2 * self.MAX_FILES:
+            self._file_expiry = [
+                (entry_expires_at, entry_id)
+                for entry_id, (entry_expires_at, _) in self._files.items()
+            ]
+            heapq.heapify(self._file_expiry)
+
+        evicted_paths = []
+        while len(self._files) > self.MAX_FILES:
+            _, (_, evicted_info) = self._files.popitem(last=False)
+            evicted_paths.append(evicted_info["file_path"])
+        if evicted_paths:
+            await asyncio.to_thread(remove_files, evicted_paths)
+
+    async def get(self, file_id: str) -> Optional[dict]:
+        """Return the file info, or None if the file is unknown or has expired."""
+        entry = self._files.get(file_id)
+        if entry is None:
+            return None
+
+        expires_at, file_info = entry
+        if time.monotonic() > expires_at:
+            # Expired entries are dropped on access together with their file
+            del self._files[file_id]
+            await asyncio.to_thread(remove_file, file_info["file_path"])
+            return None
+
+        return file_info
+
+    async def delete(self, file_id: str) -> Optional[dict]:
+        """Remove a file from the registry and return its info, if it was known."""
+        entry = self._files.pop(file_id, None)
+        return entry[1] if entry else None
+
+    async def delete_many(self, file_ids: List[str]) -> List[Optional[dict]]:
+        """Remove several files from the registry; returns their infos in order."""
+        return [await self.delete(file_id) for file_id in file_ids]
+
+    async def file_ids(self) -> List[str]:
+        """Return the IDs of all registered files."""
+        return list(self._files)
+
+    async def count(self) -> int:
+        """Return the number of registered files."""
+        return len(self._files)
+
+    async def cache_set(self, cache_key: str, file_id: str, ttl_seconds: int) -> None:
+        """Remember which stored file holds the result for cache_key."""
+        self._cache[cache_key] = (time.monotonic() + ttl_seconds, file_id)
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.MAX_FILES:
+            self._cache.popitem(last=False)
+
+    async def cache_get(self, cache_key: str) -> Optional[str]:
+        """Return the file ID cached for cache_key, or None on a miss."""
+        entry = self._cache.get(cache_key)
+        if entry is None:
+            return None
+
+        expires_at, file_id = entry
+        if time.monotonic() > expires_at:
+            del self._cache[cache_key]
+            return None
+
+        return file_id
+
+    async def increment(self, counter_key: str, window_seconds: int) -> int:
+        """Count a hit for counter_key and return the hits in its current window."""
+        now = time.monotonic()
+        entry = self._counters.get(counter_key)
+        if entry is None or now > entry[0]:
+            if len(self._counters) >= self.MAX_COUNTERS:
+                self._counters = {
+                    key: value for key, value in self._counters.items() if value[0] >= now
+                }
+            entry = (now + window_seconds, 0)
+
+        entry = (entry[0], entry[1] + 1)
+        self._counters[counter_key] = entry
+        return entry[1]
+
+    async def purge_expired(self) -> None:
+        """Drop expired entries that were never accessed again, with their files."""
+        now = time.monotonic()
+        expired_paths = []
+        while self._file_expiry and self._file_expiry[0][0] < now:
+            expires_at, file_id = heapq.heappop(self._file_expiry)
+            entry = self._files.get(file_id)
+            if entry is not None and entry[0] == expires_at:
+                del self._files[file_id]
+                expired_paths.append(entry[1]["file_path"])
+
+        for entries in (self._cache, self._counters):
+            for key in [key for key, value in entries.items() if value[0] < now]:
+                del entries[key]
+
+        # Unlinks can be slow on network filesystems, so they stay off the event loop
+        if expired_paths:
+            await asyncio.to_thread(remove_files, expired_paths)
+
+    async def close(self) -> None:
+        """Release resources; nothing to do for the in-process store."""
+
+
+class RedisFileStore:
+    """
+    Redis-backed file registry shared by every worker.
+
+    Expiry is handled by Redis key TTLs, so expired entries simply disappear.
+    """
+
+    KEY_PREFIX = "pdf:"
+    CACHE_PREFIX = "conv:"
+    COUNTER_PREFIX = "rate:"
+
+    def __init__(self, redis_url: str):
+        self._redis = redis.from_url(redis_url)
+
+    async def set(self, file_id: str, file_info: dict, ttl_seconds: int) -> None:
+        """Register a file that expires after ttl_seconds."""
+        await self._redis.set(
+            self.KEY_PREFIX + file_id, json.dumps(file_info), ex=ttl_seconds
+        )
+
+    async def get(self, file_id: str) -> Optional[dict]:
+        """Return the file info, or None if the file is unknown or has expired."""
+        value = await self._redis.get(self.KEY_PREFIX + file_id)
+        return json.loads(value) if value is not None else None
+
+    async def delete(self, file_id: str) -> Optional[dict]:
+        """Remove a file from the registry and return its info, if it was known."""
+        value = await self._redis.getdel(self.KEY_PREFIX + file_id)
+        return json.loads(value) if value is not None else None
+
+    async def delete_many(self, file_ids: List[str]) -> List[Optional[dict]]:
+        """Remove several files from the registry in one round-trip; returns their infos in order."""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for file_id in file_ids:
+                pipe.getdel(self.KEY_PREFIX + file_id)
+            values = await pipe.execute()
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def file_ids(self) -> List[str]:
+        """Return the IDs of all registered files."""
+        prefix_length = len(self.KEY_PREFIX)
+        return [
+            key.decode()[prefix_length:]
+            async for key in self._redis.scan_iter(match=self.KEY_PREFIX + "*")
+        ]
+
+    async def count(self) -> int:
+        """Return the number of registered files, counting keys as they are scanned."""
+        count = 0
+        async for _ in self._redis.scan_iter(match=self.KEY_PREFIX + "*"):
+            count += 1
+        return count
+
+    async def cache_set(self, cache_key: str, file_id: str, ttl_seconds: int) -> None:
+        """Remember which stored file holds the result for cache_key."""
+        await self._redis.set(self.CACHE_PREFIX + cache_key, file_id, ex=ttl_seconds)
+
+    async def cache_get(self, cache_key: str) -> Optional[str]:
+        """Return the file ID cached for cache_key, or None on a miss."""
+        value = await self._redis.get(self.CACHE_PREFIX + cache_key)
+        return value.decode() if value is not None else None
+
+    async def increment(self, counter_key: str, window_seconds: int) -> int:
+        """Count a hit for counter_key and return the hits in its current window."""
+        key = self.COUNTER_PREFIX + counter_key
+        # The first hit opens the window; SET NX EX and INCR run as one MULTI/EXEC,
+        # so a counter can never be left behind without its expiry
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, 0, ex=window_seconds, nx=True)
+            pipe.incr(key)
+            _, hits = await pipe.execute()
+        return hits
+
+    async def purge_expired(self) -> None:
+        """Nothing to do; Redis evicts expired keys itself."""
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self._redis.aclose()
+
+
+def create_file_store():
+    """
+    Create the file registry for this process.
+
+    Uses Redis when REDIS_URL is set and the redis package is installed,
+    otherwise falls back to the in-process store.
+    """
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url and REDIS_AVAILABLE:
+        return RedisFileStore(redis_url)
+    return MemoryFileStore()
@@ -3,14 +3,18 @@ PDF processing utilities for handling password-protected PDFs.
 """
 
 import io
-import tempfile
+import logging
 import os
+import shutil
+import subprocess
 from typing import Optional, Tuple, List
 from pathlib import Path
 
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PageObject, PasswordType, PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject
 from fastapi import HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+
+from app.utils.file_store import remove_file
 
 try:
     from pptx import Presentation
@@ -21,35 +25,93 @@ try:
 except ImportError:
     PPTX_AVAILABLE = False
 
+try:
+    import pikepdf  # libqpdf bindings, much faster than PyPDF2 on large files
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    PIKEPDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Largest upload the validators accept
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# Path to a Ghostscript binary for "high" compression. Ghostscript downsamples
+# images (lossy) and runs a PostScript interpreter on the upload, so it is only
+# used when GHOSTSCRIPT_PATH is set; otherwise "high" stays lossless
+GHOSTSCRIPT_PATH = os.environ.get("GHOSTSCRIPT_PATH") or None
+
+# Passwords tried by automatic unlock after the empty one, most frequently
+# leaked first so typical hits come early. Every attempt re-derives the
+# document key, so duplicates are dropped once at import
+COMMON_PASSWORDS = tuple(dict.fromkeys([
+    "123456", "password", "12345", "123456789", "qwerty", "1234",
+    "111111", "000000", "abc123", "password123", "admin", "123",
+    "0000", "1111", "admin123", "test", "user", "guest", "secret",
+    "default", "login", "access", "private", "public", "secure",
+    "demo", "test123", "user123", "guest123", "demo123", "public123",
+    "default123", "2222", "3333", "4444", "5555", "6666", "7777",
+    "8888", "9999"
+]))
+
+# PowerPoint geometry is in EMU: 914400 per inch, against 72 PDF points per inch
+EMU_TO_POINTS = 72 / 914400
+
+# Slide images are JPEG: a fraction of the size of PNG for rendered pages
+SLIDE_JPEG_QUALITY = 85
+
+
+def _upload_size(upload: UploadFile) -> int:
+    """Return an upload's size, from the multipart parser when it recorded one."""
+    if upload.size is not None:
+        return upload.size
+    upload.file.seek(0, 2)  # Seek to end
+    file_size = upload.file.tell()
+    upload.file.seek(0)  # Reset to beginning
+    return file_size
+
+
+def _has_unfiltered_content(page: PageObject) -> bool:
+    """Return True if any of the page's content streams is stored without a filter."""
+    contents = page.get("/Contents")
+    if contents is None:
+        return False
+    contents = contents.get_object()
+    streams = contents if isinstance(contents, ArrayObject) else [contents]
+    return any("/Filter" not in stream.get_object() for stream in streams)
+
 
 class PDFProcessor:
     """PDF processing utility for handling password-protected PDFs."""
     
     @staticmethod
     def unlock_pdf_automatically(
-        pdf_file: UploadFile
-    ) -> Tuple[bytes, str]:
+        pdf_path: str,
+        output_path: str,
+        filename: str
+    ) -> Tuple[str, int]:
         """
         Automatically unlock a password-protected PDF without requiring a password.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the uploaded PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             
         Returns:
-            Tuple of (unlocked_pdf_bytes, filename)
+            Tuple of (filename, file_size) for the unlocked PDF written to output_path
             
         Raises:
             HTTPException: If PDF cannot be unlocked automatically
         """
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
             # Use PyPDF2 for PDF processing
             try:
-                unlocked_pdf = PDFProcessor._unlock_automatically_with_pypdf2(pdf_content)
-                return unlocked_pdf, f"unlocked_{pdf_file.filename}"
+                PDFProcessor._unlock_automatically_with_pypdf2(pdf_path, output_path)
+                return f"unlocked_{filename}", os.path.getsize(output_path)
             except Exception as pypdf2_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to unlock PDF automatically. "
@@ -66,38 +128,48 @@ class PDFProcessor:
     
     @staticmethod
     def unlock_pdf_with_password(
-        pdf_file: UploadFile, 
+        pdf_path: str,
+        output_path: str,
+        filename: str,
         password: str
-    ) -> Tuple[bytes, str]:
+    ) -> Tuple[str, int]:
         """
-        Unlock a password-protected PDF and return the unlocked content.
+        Unlock a password-protected PDF and write the unlocked copy to output_path.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             password: The password to unlock the PDF
             
         Returns:
-            Tuple of (unlocked_pdf_bytes, filename)
+            Tuple of (filename, file_size) for the unlocked PDF written to output_path
             
         Raises:
             HTTPException: If password is incorrect or PDF is corrupted
+            FileNotFoundError: If pdf_path does not exist
         """
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
-            # Use PyPDF2 for PDF processing
+            # Prefer pikepdf when installed, PyPDF2 otherwise
             try:
-                unlocked_pdf = PDFProcessor._unlock_with_pypdf2(pdf_content, password)
-                return unlocked_pdf, f"unlocked_{pdf_file.filename}"
-            except Exception as pypdf2_error:
+                if PIKEPDF_AVAILABLE:
+                    PDFProcessor._unlock_with_pikepdf(pdf_path, output_path, password)
+                else:
+                    PDFProcessor._unlock_with_pypdf2(pdf_path, output_path, password)
+                return f"unlocked_{filename}", os.path.getsize(output_path)
+            except FileNotFoundError:
+                # The stored PDF is gone; the caller reports it as not found
+                raise
+            except Exception as pdf_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to unlock PDF. Please check if the password is correct. "
-                           f"PyPDF2 error: {str(pypdf2_error)}"
+                           f"{str(pdf_error)}"
                 )
                     
-        except HTTPException:
+        except (HTTPException, FileNotFoundError):
             raise
         except Exception as e:
             raise HTTPException(
@@ -107,34 +179,40 @@ class PDFProcessor:
 
     @staticmethod
     def lock_pdf_with_password(
-        pdf_file: UploadFile, 
+        pdf_path: str,
+        output_path: str,
+        filename: str,
         password: str
-    ) -> Tuple[bytes, str]:
+    ) -> Tuple[str, int]:
         """
-        Lock a PDF with a password and return the protected content.
+        Lock a PDF with a password and write the protected copy to output_path.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the uploaded PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             password: The password to protect the PDF
             
         Returns:
-            Tuple of (locked_pdf_bytes, filename)
+            Tuple of (filename, file_size) for the locked PDF written to output_path
             
         Raises:
             HTTPException: If PDF processing fails
         """
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
-            # Use PyPDF2 for PDF processing
+            # Prefer pikepdf when installed, PyPDF2 otherwise
             try:
-                locked_pdf = PDFProcessor._lock_with_pypdf2(pdf_content, password)
-                return locked_pdf, f"locked_{pdf_file.filename}"
-            except Exception as pypdf2_error:
+                if PIKEPDF_AVAILABLE:
+                    PDFProcessor._lock_with_pikepdf(pdf_path, output_path, password)
+                else:
+                    PDFProcessor._lock_with_pypdf2(pdf_path, output_path, password)
+                return f"locked_{filename}", os.path.getsize(output_path)
+            except Exception as pdf_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Failed to lock PDF. PyPDF2 error: {str(pypdf2_error)}"
+                    detail=f"Failed to lock PDF. {str(pdf_error)}"
                 )
                     
         except HTTPException:
@@ -147,34 +225,43 @@ class PDFProcessor:
     
     @staticmethod
     def compress_pdf(
-        pdf_file: UploadFile, 
+        pdf_path: str,
+        output_path: str,
+        filename: str,
         compression_level: str
-    ) -> Tuple[bytes, str]:
+    ) -> Tuple[str, int]:
         """
         Compress a PDF file to reduce its size.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the uploaded PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             compression_level: Compression level (low, medium, high)
             
         Returns:
-            Tuple of (compressed_pdf_bytes, filename)
+            Tuple of (filename, file_size) for the compressed PDF written to output_path
             
         Raises:
             HTTPException: If PDF processing fails
         """
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
-            # Use PyPDF2 for PDF processing
+            # High compression goes through Ghostscript when GHOSTSCRIPT_PATH
+            # is configured; otherwise prefer pikepdf, then PyPDF2
             try:
-                compressed_pdf = PDFProcessor._compress_with_pypdf2(pdf_content, compression_level)
-                return compressed_pdf, f"compressed_{compression_level}_{pdf_file.filename}"
-            except Exception as pypdf2_error:
+                if compression_level == "high" and GHOSTSCRIPT_PATH:
+                    PDFProcessor._compress_with_ghostscript(pdf_path, output_path)
+                elif PIKEPDF_AVAILABLE:
+                    PDFProcessor._compress_with_pikepdf(pdf_path, output_path, compression_level)
+                else:
+                    PDFProcessor._compress_with_pypdf2(pdf_path, output_path, compression_level)
+                return f"compressed_{compression_level}_{filename}", os.path.getsize(output_path)
+            except Exception as pdf_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Failed to compress PDF. PyPDF2 error: {str(pypdf2_error)}"
+                    detail=f"Failed to compress PDF. {str(pdf_error)}"
                 )
                     
         except HTTPException:
@@ -187,16 +274,20 @@ class PDFProcessor:
     
     @staticmethod
     def pdf_to_powerpoint(
-        pdf_file: UploadFile
-    ) -> Tuple[bytes, str]:
+        pdf_path: str,
+        output_path: str,
+        filename: str
+    ) -> Tuple[str, int]:
         """
         Convert a PDF file to PowerPoint format.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the uploaded PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             
         Returns:
-            Tuple of (powerpoint_bytes, filename)
+            Tuple of (filename, file_size) for the PowerPoint file written to output_path
             
         Raises:
             HTTPException: If conversion fails or dependencies not available
@@ -208,14 +299,13 @@ class PDFProcessor:
             )
         
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
             # Convert PDF to PowerPoint
             try:
-                powerpoint_content = PDFProcessor._convert_pdf_to_pptx(pdf_content)
-                return powerpoint_content, f"converted_{pdf_file.filename.replace('.pdf', '.pptx')}"
+                PDFProcessor._convert_pdf_to_pptx(pdf_path, output_path)
+                return f"converted_{filename.replace('.pdf', '.pptx')}", os.path.getsize(output_path)
             except Exception as conversion_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to convert PDF to PowerPoint. Error: {str(conversion_error)}"
@@ -231,16 +321,20 @@ class PDFProcessor:
     
     @staticmethod
     def powerpoint_to_pdf(
-        pptx_file: UploadFile
-    ) -> Tuple[bytes, str]:
+        pptx_path: str,
+        output_path: str,
+        filename: str
+    ) -> Tuple[str, int]:
         """
         Convert a PowerPoint file to PDF format.
         
         Args:
-            pptx_file: The uploaded PowerPoint file
+            pptx_path: Path to the uploaded PowerPoint file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             
         Returns:
-            Tuple of (pdf_bytes, filename)
+            Tuple of (filename, file_size) for the PDF written to output_path
             
         Raises:
             HTTPException: If conversion fails or dependencies not available.
@@ -252,14 +346,13 @@ class PDFProcessor:
             )
         
         try:
-            # Read the uploaded file content
-            pptx_content = pptx_file.file.read()
-            
             # Convert PowerPoint to PDF
             try:
-                pdf_content = PDFProcessor._convert_pptx_to_pdf(pptx_content)
-                return pdf_content, f"converted_{pptx_file.filename.replace('.pptx', '.pdf')}"
+                PDFProcessor._convert_pptx_to_pdf(pptx_path, output_path)
+                return f"converted_{filename.replace('.pptx', '.pdf')}", os.path.getsize(output_path)
             except Exception as conversion_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to convert PowerPoint to PDF. Error: {str(conversion_error)}"
@@ -275,31 +368,35 @@ class PDFProcessor:
     
     @staticmethod
     def jpg_to_pdf(
-        jpg_files: List[UploadFile],
+        jpg_paths: List[str],
+        output_path: str,
+        filename: str,
         page_orientation: str = "portrait",
         page_size: str = "a4",
         margin: str = "no_margin",
         merge_all: bool = True
-    ) -> Tuple[bytes, str]:
+    ) -> Tuple[str, int]:
         """
         Convert JPG images to PDF format with configurable options.
         
         Args:
-            jpg_files: List of uploaded JPG image files
+            jpg_paths: Paths to the uploaded JPG image files on disk
+            output_path: Path the result is written to
+            filename: Original filename of the first image
             page_orientation: "portrait" or "landscape"
             page_size: "a4", "us_letter", or "fit"
             margin: "no_margin", "small", or "big"
             merge_all: Whether to merge all images into one PDF file
             
         Returns:
-            Tuple of (pdf_bytes, filename)
+            Tuple of (filename, file_size) for the PDF written to output_path
             
         Raises:
             HTTPException: If conversion fails
         """
         try:
             # Validate inputs
-            if not jpg_files:
+            if not jpg_paths:
                 raise HTTPException(
                     status_code=400,
                     detail="At least one JPG file is required"
@@ -325,19 +422,21 @@ class PDFProcessor:
             
             # Convert JPG to PDF
             try:
-                pdf_content = PDFProcessor._convert_jpgs_to_pdf(
-                    jpg_files, page_orientation, page_size, margin, merge_all
+                PDFProcessor._convert_jpgs_to_pdf(
+                    jpg_paths, output_path, page_orientation, page_size, margin, merge_all
                 )
                 
                 # Generate filename
-                if merge_all and len(jpg_files) > 1:
-                    filename = f"merged_{len(jpg_files)}_images.pdf"
+                if merge_all and len(jpg_paths) > 1:
+                    output_filename = f"merged_{len(jpg_paths)}_images.pdf"
                 else:
-                    filename = f"converted_{jpg_files[0].filename.replace('.jpg', '.pdf').replace('.jpeg', '.pdf')}"
+                    output_filename = f"converted_{filename.replace('.jpg', '.pdf').replace('.jpeg', '.pdf')}"
                 
-                return pdf_content, filename
+                return output_filename, os.path.getsize(output_path)
                 
             except Exception as conversion_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to convert JPG to PDF. Error: {str(conversion_error)}"
@@ -353,31 +452,34 @@ class PDFProcessor:
     
     @staticmethod
     def pdf_to_jpg(
-        pdf_file: UploadFile,
+        pdf_path: str,
+        output_path: str,
+        filename: str,
         page_number: int = 1
-    ) -> Tuple[bytes, str]:
+    ) -> Tuple[str, int]:
         """
         Convert a PDF page to JPG format.
         
         Args:
-            pdf_file: The uploaded PDF file
+            pdf_path: Path to the uploaded PDF file on disk
+            output_path: Path the result is written to
+            filename: Original filename of the upload
             page_number: Page number to convert (default: 1)
             
         Returns:
-            Tuple of (jpg_bytes, filename)
+            Tuple of (filename, file_size) for the JPG image written to output_path
             
         Raises:
             HTTPException: If conversion fails
         """
         try:
-            # Read the uploaded file content
-            pdf_content = pdf_file.file.read()
-            
             # Convert PDF to JPG
             try:
-                jpg_content = PDFProcessor._convert_pdf_to_jpg(pdf_content, page_number)
-                return jpg_content, f"converted_page_{page_number}_{pdf_file.filename.replace('.pdf', '.jpg')}"
+                PDFProcessor._convert_pdf_to_jpg(pdf_path, output_path, page_number)
+                return f"converted_page_{page_number}_{filename.replace('.pdf', '.jpg')}", os.path.getsize(output_path)
             except Exception as conversion_error:
+                # Don't leave a partial result behind
+                remove_file(output_path)
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to convert PDF to JPG. Error: {str(conversion_error)}"
@@ -392,37 +494,25 @@ class PDFProcessor:
             )
     
     @staticmethod
-    def _unlock_automatically_with_pypdf2(pdf_content: bytes) -> bytes:
+    def _unlock_automatically_with_pypdf2(pdf_path: str, output_path: str) -> None:
         """Automatically unlock PDF using PyPDF2 library without password."""
         try:
-            # Create input buffer
-            input_buffer = io.BytesIO(pdf_content)
-            
             # Create PDF reader
-            reader = PdfReader(input_buffer)
+            reader = PdfReader(pdf_path)
             
             # Check if PDF is encrypted
             if reader.is_encrypted:
-                # Try to decrypt with empty password first
-                if reader.decrypt(""):
-                    print("DEBUG: Successfully decrypted with empty password")
+                # Try to decrypt with empty password first; this also matches
+                # owner-password-only PDFs, which then skip the list entirely
+                if reader.decrypt("") != PasswordType.NOT_DECRYPTED:
+                    logger.debug("Successfully decrypted with empty password")
                 else:
                     # Try common passwords
-                    common_passwords = [
-                        "", "password", "123456", "admin", "user", "1234", "12345", 
-                        "123456789", "qwerty", "abc123", "password123", "admin123",
-                        "user123", "test", "test123", "demo", "demo123", "guest",
-                        "guest123", "public", "public123", "default", "default123",
-                        "123", "0000", "1111", "2222", "3333", "4444", "5555",
-                        "6666", "7777", "8888", "9999", "000000", "111111",
-                        "secret", "private", "secure", "access", "login"
-                    ]
-                    
                     decrypted = False
-                    for pwd in common_passwords:
+                    for pwd in COMMON_PASSWORDS:
                         try:
-                            if reader.decrypt(pwd):
-                                print(f"DEBUG: Successfully decrypted with password: {pwd}")
+                            if reader.decrypt(pwd) != PasswordType.NOT_DECRYPTED:
+                                logger.debug("Successfully decrypted with password: %s", pwd)
                                 decrypted = True
                                 break
                         except Exception:
@@ -435,7 +525,7 @@ class PDFProcessor:
                             # Try to access pages without decryption
                             page_count = len(reader.pages)
                             if page_count > 0:
-                                print("DEBUG: PDF appears to be readable without decryption")
+                                logger.debug("PDF appears to be readable without decryption")
                                 # If we can access pages, the PDF might not actually be encrypted
                                 pass
                             else:
@@ -449,9 +539,11 @@ class PDFProcessor:
                                 detail="Cannot unlock PDF automatically. The PDF is protected with a strong password that cannot be automatically detected."
                             )
             else:
-                print("DEBUG: PDF is not encrypted")
+                logger.debug("PDF is not encrypted")
                 # PDF is not encrypted, just return the original content
-                pass
+                # without parsing and re-serializing every page
+                shutil.copyfile(pdf_path, output_path)
+                return
             
             # Create PDF writer
             writer = PdfWriter()
@@ -463,37 +555,26 @@ class PDFProcessor:
             # IMPORTANT: Do NOT encrypt the output PDF
             # The writer should remain unencrypted to create an unlocked PDF
             
-            # Create output buffer
-            output_buffer = io.BytesIO()
+            # Write the unlocked PDF to disk (without encryption)
+            writer.write(output_path)
             
-            # Write the unlocked PDF to buffer (without encryption)
-            writer.write(output_buffer)
-            
-            # Get the content
-            unlocked_content = output_buffer.getvalue()
-            
-            print(f"DEBUG: Successfully created unlocked PDF of size: {len(unlocked_content)} bytes")
-            
-            return unlocked_content
+            logger.debug("Created unlocked PDF: %s", output_path)
             
         except HTTPException:
             raise
         except Exception as e:
-            print(f"DEBUG: Error in automatic unlock: {str(e)}")
+            logger.debug("Error in automatic unlock: %s", e)
             # If it's a PyPDF2 specific error, try alternative approach
             try:
                 # Try to create a new PDF reader and writer
-                input_buffer = io.BytesIO(pdf_content)
-                reader = PdfReader(input_buffer)
+                reader = PdfReader(pdf_path)
                 writer = PdfWriter()
                 
                 # Try to add pages without decryption
                 for page in reader.pages:
                     writer.add_page(page)
                 
-                output_buffer = io.BytesIO()
-                writer.write(output_buffer)
-                return output_buffer.getvalue()
+                writer.write(output_path)
                 
             except Exception as fallback_error:
                 raise HTTPException(
@@ -502,14 +583,11 @@ class PDFProcessor:
                 )
     
     @staticmethod
-    def _unlock_with_pypdf2(pdf_content: bytes, password: str) -> bytes:
+    def _unlock_with_pypdf2(pdf_path: str, output_path: str, password: str) -> None:
         """Unlock PDF using PyPDF2 library."""
         try:
-            # Create input buffer
-            input_buffer = io.BytesIO(pdf_content)
-            
             # Create PDF reader
-            reader = PdfReader(input_buffer)
+            reader = PdfReader(pdf_path)
             
             # Check if PDF is encrypted
             if reader.is_encrypted:
@@ -527,17 +605,11 @@ class PDFProcessor:
             for page in reader.pages:
                 writer.add_page(page)
             
-            # Create output buffer
-            output_buffer = io.BytesIO()
-            
-            # Write the unlocked PDF to buffer
-            writer.write(output_buffer)
-            
-            # Get the content
-            unlocked_content = output_buffer.getvalue()
-            
-            return unlocked_content
+            # Write the unlocked PDF to disk
+            writer.write(output_path)
             
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=400,
@@ -545,14 +617,31 @@ class PDFProcessor:
             )
 
     @staticmethod
-    def _lock_with_pypdf2(pdf_content: bytes, password: str) -> bytes:
+    def _unlock_with_pikepdf(pdf_path: str, output_path: str, password: str) -> None:
+        """Unlock PDF using pikepdf (libqpdf)."""
+        try:
+            with pikepdf.open(pdf_path, password=password) as pdf:
+                # Saving without an encryption argument drops the protection
+                pdf.save(output_path)
+        except pikepdf.PasswordError:
+            raise HTTPException(
+                status_code=400,
+                detail="Incorrect password provided"
+            )
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error unlocking PDF with pikepdf: {str(e)}"
+            )
+
+    @staticmethod
+    def _lock_with_pypdf2(pdf_path: str, output_path: str, password: str) -> None:
         """Lock PDF using PyPDF2 library."""
         try:
-            # Create input buffer
-            input_buffer = io.BytesIO(pdf_content)
-            
             # Create PDF reader
-            reader = PdfReader(input_buffer)
+            reader = PdfReader(pdf_path)
             
             # Create PDF writer
             writer = PdfWriter()
@@ -564,16 +653,8 @@ class PDFProcessor:
             # Encrypt the PDF with password
             writer.encrypt(password)
             
-            # Create output buffer
-            output_buffer = io.BytesIO()
-            
-            # Write the locked PDF to buffer
-            writer.write(output_buffer)
-            
-            # Get the content
-            locked_content = output_buffer.getvalue()
-            
-            return locked_content
+            # Write the locked PDF to disk
+            writer.write(output_path)
             
         except Exception as e:
             raise HTTPException(
@@ -582,70 +663,57 @@ class PDFProcessor:
             )
     
     @staticmethod
-    def _compress_with_pypdf2(pdf_content: bytes, compression_level: str) -> bytes:
+    def _lock_with_pikepdf(pdf_path: str, output_path: str, password: str) -> None:
+        """Lock PDF using pikepdf (libqpdf)."""
+        try:
+            with pikepdf.open(pdf_path) as pdf:
+                # 128-bit RC4 with one password, the same output as PyPDF2's encrypt()
+                pdf.save(
+                    output_path,
+                    encryption=pikepdf.Encryption(
+                        owner=password, user=password, R=3, aes=False, metadata=False
+                    )
+                )
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error locking PDF with pikepdf: {str(e)}"
+            )
+    
+    @staticmethod
+    def _compress_with_pypdf2(pdf_path: str, output_path: str, compression_level: str) -> None:
         """Compress PDF using PyPDF2 library."""
         try:
-            # Create input buffer
-            input_buffer = io.BytesIO(pdf_content)
-            
             # Create PDF reader
-            reader = PdfReader(input_buffer)
+            reader = PdfReader(pdf_path)
             
             # Create PDF writer
             writer = PdfWriter()
             
-            # Set compression parameters based on level
-            if compression_level == "low":
-                # Minimal compression - preserve quality
-                compression_settings = {
-                    "compress": True,
-                    "compress_content_streams": True,
-                    "object_stream_mode": 1
-                }
-            elif compression_level == "medium":
-                # Balanced compression
-                compression_settings = {
-                    "compress": True,
-                    "compress_content_streams": True,
-                    "object_stream_mode": 2
-                }
-            elif compression_level == "high":
-                # Maximum compression
-                compression_settings = {
-                    "compress": True,
-                    "compress_content_streams": True,
-                    "object_stream_mode": 3
-                }
-            else:
-                # Default to medium
-                compression_settings = {
-                    "compress": True,
-                    "compress_content_streams": True,
-                    "object_stream_mode": 2
-                }
+            # PyPDF2 3.x has no deflate levels, so every compression_level is
+            # handled alike; pikepdf and Ghostscript differentiate them
             
-            # Add all pages from reader to writer
+            # Deflate page content that is stored uncompressed. This happens on the
+            # reader's pages, before add_page copies them, so the writer never
+            # holds the original streams; re-encoding streams that are already
+            # filtered only costs time and tends to grow them
             for page in reader.pages:
+                if _has_unfiltered_content(page):
+                    page.compress_content_streams()
                 writer.add_page(page)
             
-            # Apply compression settings
-            writer._compress = compression_settings["compress"]
-            writer._compress_content_streams = compression_settings["compress_content_streams"]
-            writer._object_stream_mode = compression_settings["object_stream_mode"]
-            
-            # Create output buffer
-            output_buffer = io.BytesIO()
-            
-            # Write the compressed PDF to buffer
-            writer.write(output_buffer)
-            
-            # Get the content
-            compressed_content = output_buffer.getvalue()
-            
-            print(f"DEBUG: Original size: {len(pdf_content)} bytes, Compressed size: {len(compressed_content)} bytes")
-            print(f"DEBUG: Compression ratio: {((len(pdf_content) - len(compressed_content)) / len(pdf_content) * 100):.1f}%")
-            
-            return compressed_content
+            # Write the compressed PDF to disk
+            writer.write(output_path)
+            
+            # Only stat the files when someone is reading the debug log
+            if logger.isEnabledFor(logging.DEBUG):
+                original_size = os.path.getsize(pdf_path)
+                compressed_size = os.path.getsize(output_path)
+                logger.debug(
+                    "Compressed %s bytes to %s bytes (%.1f%%)",
+                    original_size, compressed_size,
+                    (original_size - compressed_size) / original_size * 100
+                )
             
         except Exception as e:
             raise HTTPException(
@@ -654,16 +722,71 @@ class PDFProcessor:
             )
     
     @staticmethod
-    def _convert_pdf_to_pptx(pdf_content: bytes) -> bytes:
+    def _compress_with_pikepdf(pdf_path: str, output_path: str, compression_level: str) -> None:
+        """Compress PDF using pikepdf (libqpdf)."""
+        try:
+            with pikepdf.open(pdf_path) as pdf:
+                if compression_level == "low":
+                    # Only compress streams that are stored uncompressed
+                    pdf.save(output_path, compress_streams=True)
+                else:
+                    # Pack objects into compressed object streams and re-deflate
+                    # generically encoded streams
+                    pdf.save(
+                        output_path,
+                        compress_streams=True,
+                        object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                        stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                        recompress_flate=compression_level == "high"
+                    )
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error compressing PDF with pikepdf: {str(e)}"
+            )
+    
+    @staticmethod
+    def _compress_with_ghostscript(pdf_path: str, output_path: str) -> None:
+        """Compress PDF by rewriting it with Ghostscript's /ebook settings."""
+        try:
+            subprocess.run(
+                [
+                    GHOSTSCRIPT_PATH,
+                    "-sDEVICE=pdfwrite",
+                    "-dPDFSETTINGS=/ebook",
+                    "-dNOPAUSE",
+                    "-dBATCH",
+                    "-dQUIET",
+                    "-dSAFER",
+                    f"-sOutputFile={output_path}",
+                    pdf_path
+                ],
+                check=True,
+                capture_output=True,
+                timeout=300
+            )
+        except subprocess.CalledProcessError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error compressing PDF with Ghostscript: {e.stderr.decode(errors='replace').strip()}"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error compressing PDF with Ghostscript: {str(e)}"
+            )
+    
+    @staticmethod
+    def _convert_pdf_to_pptx(pdf_path: str, output_path: str) -> None:
         """Convert PDF to PowerPoint using PyMuPDF and python-pptx."""
         try:
             # Create a new PowerPoint presentation
             prs = Presentation()
             
             # Open PDF with PyMuPDF
-            pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+            pdf_document = fitz.open(pdf_path, filetype="pdf")
             
-            print(f"DEBUG: Converting PDF with {len(pdf_document)} pages to PowerPoint")
+            logger.debug("Converting PDF with %s pages to PowerPoint", len(pdf_document))
             
             # Get the first page to determine PDF dimensions
             first_page = pdf_document[0]
@@ -681,58 +804,39 @@ class PDFProcessor:
             prs.slide_width = int(pdf_width_inches * 914400)
             prs.slide_height = int(pdf_height_inches * 914400)
             
-            print(f"DEBUG: PDF dimensions: {pdf_width} x {pdf_height} points")
-            print(f"DEBUG: PowerPoint slide dimensions: {prs.slide_width} x {prs.slide_height} EMU")
+            logger.debug("PDF dimensions: %s x %s points", pdf_width, pdf_height)
+            logger.debug("PowerPoint slide dimensions: %s x %s EMU", prs.slide_width, prs.slide_height)
+            
+            # Resolve the blank layout once rather than per slide
+            blank_layout = prs.slide_layouts[6]
             
-            # Process each page
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
+            # Scale factor for better quality
+            matrix = fitz.Matrix(2, 2)
+            
+            # Process each page; the conversion already runs in a pool worker,
+            # so pages are rendered serially from the open document
+            for page in pdf_document:
+                image_bytes = page.get_pixmap(matrix=matrix).tobytes("jpeg", jpg_quality=SLIDE_JPEG_QUALITY)
                 
                 # Create a new slide
-                slide_layout = prs.slide_layouts[6]  # Blank layout
-                slide = prs.slides.add_slide(slide_layout)
-                
-                # Convert page to image
-                mat = fitz.Matrix(2, 2)  # Scale factor for better quality
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
+                slide = prs.slides.add_slide(blank_layout)
                 
-                # Save image to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                    img.save(temp_img.name, 'PNG')
-                    temp_img_path = temp_img.name
-                
-                try:
-                    # Add image to slide - fill the entire slide to maintain PDF dimensions
-                    slide.shapes.add_picture(
-                        temp_img_path,
-                        left=0,
-                        top=0,
-                        width=prs.slide_width,
-                        height=prs.slide_height
-                    )
-                    
-                    print(f"DEBUG: Added page {page_num + 1} to PowerPoint slide with full dimensions")
-                    
-                finally:
-                    # Clean up temporary image file
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
+                # Add image to slide - fill the entire slide to maintain PDF dimensions
+                slide.shapes.add_picture(
+                    io.BytesIO(image_bytes),
+                    left=0,
+                    top=0,
+                    width=prs.slide_width,
+                    height=prs.slide_height
+                )
             
             # Close PDF document
             pdf_document.close()
             
-            # Save PowerPoint to bytes
-            output_buffer = io.BytesIO()
-            prs.save(output_buffer)
-            powerpoint_content = output_buffer.getvalue()
-            
-            print(f"DEBUG: Successfully created PowerPoint with PDF dimensions, size: {len(powerpoint_content)} bytes")
+            # Save PowerPoint to disk
+            prs.save(output_path)
             
-            return powerpoint_content
+            logger.debug("Created PowerPoint with %s slides: %s", len(prs.slides), output_path)
             
         except Exception as e:
             raise HTTPException(
@@ -741,16 +845,13 @@ class PDFProcessor:
             )
     
     @staticmethod
-    def _convert_pptx_to_pdf(pptx_content: bytes) -> bytes:
+    def _convert_pptx_to_pdf(pptx_path: str, output_path: str) -> None:
         """Convert PowerPoint to PDF using python-pptx and PyMuPDF."""
         try:
-            # Create input buffer for PowerPoint
-            input_buffer = io.BytesIO(pptx_content)
-            
             # Open PowerPoint presentation
-            prs = Presentation(input_buffer)
+            prs = Presentation(pptx_path)
             
-            print(f"DEBUG: Converting PowerPoint with {len(prs.slides)} slides to PDF")
+            logger.debug("Converting PowerPoint with %s slides to PDF", len(prs.slides))
             
             # Get PowerPoint slide dimensions
             pptx_width_emu = prs.slide_width
@@ -765,8 +866,8 @@ class PDFProcessor:
             pdf_width_points = int(pptx_width_inches * 72)
             pdf_height_points = int(pptx_height_inches * 72)
             
-            print(f"DEBUG: PowerPoint dimensions: {pptx_width_emu} x {pptx_height_emu} EMU")
-            print(f"DEBUG: PDF dimensions: {pdf_width_points} x {pdf_height_points} points")
+            logger.debug("PowerPoint dimensions: %s x %s EMU", pptx_width_emu, pptx_height_emu)
+            logger.debug("PDF dimensions: %s x %s points", pdf_width_points, pdf_height_points)
             
             # Create PDF document
             pdf_document = fitz.open()
@@ -776,7 +877,11 @@ class PDFProcessor:
                 # Create a new page for each slide with PowerPoint dimensions
                 page = pdf_document.new_page(width=pdf_width_points, height=pdf_height_points)
                 
-                print(f"DEBUG: Processing slide {slide_num + 1}")
+                logger.debug("Processing slide %s", slide_num + 1)
+                
+                # Text from all of the slide's text boxes is drawn into one
+                # shape and written to the page's content stream in one commit
+                text_shape = page.new_shape()
                 
                 # Process shapes on the slide
                 for shape in slide.shapes:
@@ -786,37 +891,26 @@ class PDFProcessor:
                             # Get image data
                             image_data = shape.image.blob
                             
-                            # Convert to PIL Image
-                            img = Image.open(io.BytesIO(image_data))
-                            
-                            # Save image to temporary file
-                            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                                img.save(temp_img.name, 'PNG')
-                                temp_img_path = temp_img.name
+                            # Get shape position and size (convert from EMU to PDF points)
+                            left = shape.left * EMU_TO_POINTS
+                            top = shape.top * EMU_TO_POINTS
+                            width = shape.width * EMU_TO_POINTS
+                            height = shape.height * EMU_TO_POINTS
+                            image_rect = fitz.Rect(left, top, left + width, top + height)
                             
+                            # Insert the embedded image bytes as they are
                             try:
-                                # Get shape position and size (convert from EMU to PDF points)
-                                # 1 EMU = 1/914400 inch, 1 inch = 72 points
-                                left = shape.left * 72 / 914400
-                                top = shape.top * 72 / 914400
-                                width = shape.width * 72 / 914400
-                                height = shape.height * 72 / 914400
-                                
-                                # Insert image into PDF page
-                                page.insert_image(
-                                    fitz.Rect(left, top, left + width, top + height),
-                                    filename=temp_img_path
-                                )
-                                
-                                print(f"DEBUG: Added image to slide {slide_num + 1}")
-                                
-                            finally:
-                                # Clean up temporary image file
-                                if os.path.exists(temp_img_path):
-                                    os.unlink(temp_img_path)
-                                    
+                                page.insert_image(image_rect, stream=image_data)
+                            except Exception:
+                                # Formats MuPDF can't read (e.g. WMF) go through Pillow
+                                image_buffer = io.BytesIO()
+                                Image.open(io.BytesIO(image_data)).save(image_buffer, 'PNG')
+                                page.insert_image(image_rect, stream=image_buffer.getvalue())
+                            
+                            logger.debug("Added image to slide %s", slide_num + 1)
+                            
                         except Exception as img_error:
-                            print(f"DEBUG: Error processing image in slide {slide_num + 1}: {str(img_error)}")
+                            logger.debug("Error processing image in slide %s: %s", slide_num + 1, img_error)
                             continue
                     
                     elif hasattr(shape, 'text'):
@@ -825,33 +919,33 @@ class PDFProcessor:
                             text = shape.text
                             if text.strip():
                                 # Get text position (convert from EMU to PDF points)
-                                left = shape.left * 72 / 914400
-                                top = shape.top * 72 / 914400
-                                width = shape.width * 72 / 914400
-                                height = shape.height * 72 / 914400
+                                left = shape.left * EMU_TO_POINTS
+                                top = shape.top * EMU_TO_POINTS
+                                height = shape.height * EMU_TO_POINTS
                                 
-                                # Insert text into PDF page
-                                page.insert_text(
+                                # Queue text for the PDF page
+                                text_shape.insert_text(
                                     fitz.Point(left, top + height/2),  # Center text vertically
                                     text,
                                     fontsize=12
                                 )
                                 
-                                print(f"DEBUG: Added text to slide {slide_num + 1}")
+                                logger.debug("Added text to slide %s", slide_num + 1)
                                 
                         except Exception as text_error:
-                            print(f"DEBUG: Error processing text in slide {slide_num + 1}: {str(text_error)}")
+                            logger.debug("Error processing text in slide %s: %s", slide_num + 1, text_error)
                             continue
                 
-                print(f"DEBUG: Completed slide {slide_num + 1}")
+                # Write the queued text to the page
+                text_shape.commit()
+                
+                logger.debug("Completed slide %s", slide_num + 1)
             
-            # Save PDF to bytes
-            pdf_bytes = pdf_document.write()
+            # Save PDF to disk
+            pdf_document.save(output_path)
             pdf_document.close()
             
-            print(f"DEBUG: Successfully converted PowerPoint to PDF with original dimensions, size: {len(pdf_bytes)} bytes")
-            
-            return pdf_bytes
+            logger.debug("Converted PowerPoint to PDF with original dimensions: %s", output_path)
             
         except Exception as e:
             raise HTTPException(
@@ -861,14 +955,15 @@ class PDFProcessor:
     
     @staticmethod
     def _convert_jpgs_to_pdf(
-        jpg_files: List[UploadFile],
+        jpg_paths: List[str],
+        output_path: str,
         page_orientation: str = "portrait",
         page_size: str = "a4",
         margin: str = "no_margin",
         merge_all: bool = True
-    ) -> bytes:
+    ) -> None:
         """
-        Convert multiple JPG images to a single PDF file.
+        Convert multiple JPG images to a single PDF file written to output_path.
         Supports configurable page orientation, size, margins, and merging.
         """
         try:
@@ -876,12 +971,9 @@ class PDFProcessor:
             pdf_document = fitz.open()
             
             # Process each JPG file
-            for i, jpg_file in enumerate(jpg_files):
-                # Read the uploaded file content
-                jpg_content = jpg_file.file.read()
-                
-                # Convert JPG to PIL Image
-                img = Image.open(io.BytesIO(jpg_content))
+            for i, jpg_path in enumerate(jpg_paths):
+                # Open the JPG with PIL; only the header is read here
+                img = Image.open(jpg_path)
                 
                 # Get image dimensions
                 img_width, img_height = img.size
@@ -920,98 +1012,37 @@ class PDFProcessor:
                 # Add a new page with the determined dimensions
                 page = pdf_document.new_page(width=pdf_width, height=pdf_height)
                 
-                # Save image to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
-                    img.save(temp_img.name, 'JPEG')
-                    temp_img_path = temp_img.name
-                
+                # Embed the uploaded JPEG as-is; MuPDF keeps the compressed
+                # data, so the image is never decoded or re-encoded
+                page_rect = fitz.Rect(0, 0, pdf_width, pdf_height)
                 try:
-                    # Insert image into PDF page
-                    page.insert_image(
-                        fitz.Rect(0, 0, pdf_width, pdf_height),
-                        filename=temp_img_path
-                    )
-                    
-                    print(f"DEBUG: Added image {i+1} to PDF page {len(pdf_document)}")
-                    
-                finally:
-                    # Clean up temporary image file
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
-            
-            # Save PDF to bytes
-            pdf_bytes = pdf_document.write()
-            pdf_document.close()
-            
-            print(f"DEBUG: Successfully merged {len(jpg_files)} JPG images into a single PDF, size: {len(pdf_bytes)} bytes")
-            
-            return pdf_bytes
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Error merging JPG images to PDF: {str(e)}"
-            )
-    
-    @staticmethod
-    def _convert_jpg_to_pdf(jpg_content: bytes) -> bytes:
-        """Convert JPG to PDF using PyMuPDF."""
-        try:
-            # Create PDF document
-            pdf_document = fitz.open()
-            
-            # Convert JPG to PIL Image
-            img = Image.open(io.BytesIO(jpg_content))
-            
-            # Get image dimensions
-            img_width, img_height = img.size
-            
-            # Convert pixels to points (assuming 72 DPI)
-            pdf_width = img_width * 72 / 96  # Convert from pixels to points
-            pdf_height = img_height * 72 / 96
-            
-            # Create a new page with image dimensions
-            page = pdf_document.new_page(width=pdf_width, height=pdf_height)
-            
-            # Save image to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
-                img.save(temp_img.name, 'JPEG')
-                temp_img_path = temp_img.name
-            
-            try:
-                # Insert image into PDF page
-                page.insert_image(
-                    fitz.Rect(0, 0, pdf_width, pdf_height),
-                    filename=temp_img_path
-                )
+                    page.insert_image(page_rect, filename=jpg_path)
+                except Exception:
+                    # Re-encode only files MuPDF can't embed directly
+                    image_buffer = io.BytesIO()
+                    img.convert("RGB").save(image_buffer, 'JPEG')
+                    page.insert_image(page_rect, stream=image_buffer.getvalue())
                 
-                print(f"DEBUG: Converted JPG to PDF, dimensions: {pdf_width} x {pdf_height} points")
-                
-            finally:
-                # Clean up temporary image file
-                if os.path.exists(temp_img_path):
-                    os.unlink(temp_img_path)
+                logger.debug("Added image %s to PDF page %s", i+1, len(pdf_document))
             
-            # Save PDF to bytes
-            pdf_bytes = pdf_document.write()
+            # Save PDF to disk
+            pdf_document.save(output_path)
             pdf_document.close()
             
-            print(f"DEBUG: Successfully converted JPG to PDF, size: {len(pdf_bytes)} bytes")
-            
-            return pdf_bytes
+            logger.debug("Merged %s JPG images into a single PDF: %s", len(jpg_paths), output_path)
             
         except Exception as e:
             raise HTTPException(
                 status_code=400,
-                detail=f"Error converting JPG to PDF: {str(e)}"
+                detail=f"Error merging JPG images to PDF: {str(e)}"
             )
     
     @staticmethod
-    def _convert_pdf_to_jpg(pdf_content: bytes, page_number: int = 1) -> bytes:
+    def _convert_pdf_to_jpg(pdf_path: str, output_path: str, page_number: int = 1) -> None:
         """Convert PDF page to JPG using PyMuPDF."""
         try:
             # Open PDF with PyMuPDF
-            pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+            pdf_document = fitz.open(pdf_path, filetype="pdf")
             
             # Check if page number is valid
             if page_number < 1 or page_number > len(pdf_document):
@@ -1023,25 +1054,17 @@ class PDFProcessor:
             # Get the specified page (convert to 0-based index)
             page = pdf_document[page_number - 1]
             
-            # Convert page to image with high quality
+            # Convert page to image with high quality; JPEG has no alpha channel
             mat = fitz.Matrix(2, 2)  # Scale factor for better quality
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to PIL Image first, then to JPEG
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
+            pix = page.get_pixmap(matrix=mat, alpha=False)
             
-            # Convert to JPEG with high quality
-            output_buffer = io.BytesIO()
-            img.save(output_buffer, format='JPEG', quality=95)
-            jpg_data = output_buffer.getvalue()
+            # Encode to JPEG with high quality directly in PyMuPDF
+            pix.save(output_path, output="jpeg", jpg_quality=95)
             
             # Close PDF document
             pdf_document.close()
             
-            print(f"DEBUG: Successfully converted PDF page {page_number} to JPG, size: {len(jpg_data)} bytes")
-            
-            return jpg_data
+            logger.debug("Converted PDF page %s to JPG: %s", page_number, output_path)
             
         except HTTPException:
             raise
@@ -1077,11 +1100,7 @@ class PDFProcessor:
             )
         
         # Check file size (limit to 50MB)
-        pdf_file.file.seek(0, 2)  # Seek to end
-        file_size = pdf_file.file.tell()
-        pdf_file.file.seek(0)  # Reset to beginning
-        
-        if file_size > 50 * 1024 * 1024:  # 50MB limit
+        if _upload_size(pdf_file) > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
                 detail="File size must be less than 50MB"
@@ -1113,11 +1132,7 @@ class PDFProcessor:
             )
         
         # Check file size (limit to 50MB)
-        pptx_file.file.seek(0, 2)  # Seek to end
-        file_size = pptx_file.file.tell()
-        pptx_file.file.seek(0)  # Reset to beginning
-        
-        if file_size > 50 * 1024 * 1024:  # 50MB limit
+        if _upload_size(pptx_file) > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
                 detail="File size must be less than 50MB"
@@ -1149,36 +1164,8 @@ class PDFProcessor:
             )
         
         # Check file size (limit to 50MB)
-        jpg_file.file.seek(0, 2)  # Seek to end
-        file_size = jpg_file.file.tell()
-        jpg_file.file.seek(0)  # Reset to beginning
-        
-        if file_size > 50 * 1024 * 1024:  # 50MB limit
+        if _upload_size(jpg_file) > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
                 detail="File size must be less than 50MB"
             )
-    
-    @staticmethod
-    def create_streaming_response(
-        pdf_content: bytes, 
-        filename: str
-    ) -> StreamingResponse:
-        """
-        Create a streaming response for the unlocked PDF.
-        
-        Args:
-            pdf_content: The unlocked PDF content
-            filename: The filename for the response
-            
-        Returns:
-            StreamingResponse with the PDF content
-        """
-        return StreamingResponse(
-            io.BytesIO(pdf_content),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Length": str(len(pdf_content))
-            }
-        )
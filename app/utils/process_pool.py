@@ -0,0 +1,71 @@
+"""
+Process pool for running CPU-bound PDF conversions outside the GIL.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+
+class ProcessingError(Exception):
+    """Picklable stand-in for an HTTPException raised inside a worker process."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _call_in_worker(fn: Callable, *args) -> Any:
+    """Run fn in a worker process, translating HTTPException so it survives pickling."""
+    try:
+        return fn(*args)
+    except HTTPException as e:
+        raise ProcessingError(e.status_code, e.detail) from None
+
+
+def create_executor() -> Optional[Executor]:
+    """
+    Create the conversion process pool.
+
+    Every web worker process gets its own pool, so the default splits the
+    CPUs between them: CPU count divided by WORKERS (the web worker count,
+    which the gunicorn configs export), and at least one. CONVERSION_WORKERS
+    overrides the per-process size; setting it to 0 disables the pool and
+    conversions fall back to the default thread pool.
+    """
+    web_workers = max(1, int(os.environ.get("WORKERS", "1")))
+    default_workers = max(1, (os.cpu_count() or 1) // web_workers)
+    workers = int(os.environ.get("CONVERSION_WORKERS", default_workers))
+    if workers <= 0:
+        return None
+    # Spawned workers don't inherit the server's threads or open connections
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+async def run_in_executor(executor: Optional[Executor], fn: Callable, *args) -> Any:
+    """
+    Run a PDFProcessor method in the executor and await its result.
+
+    Args:
+        executor: Process pool from create_executor, or None for the thread pool
+        fn: Module-level function or static method taking picklable arguments
+        *args: Arguments for fn, such as file paths and options
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        HTTPException: If fn raised one in the worker
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, _call_in_worker, fn, *args)
+    except ProcessingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -64,6 +64,8 @@ echo backlog = 2048
 echo.
 echo # Worker processes
 echo workers = int^(os.getenv^('WORKERS', multiprocessing.cpu_count^(^) * 2 + 1^)^)
+echo # Worker processes inherit this; the app divides the CPUs between their conversion pools
+echo os.environ["WORKERS"] = str^(workers^)
 echo worker_class = "uvicorn.workers.UvicornWorker"
 echo worker_connections = 1000
 echo max_requests = 1000
@@ -71,6 +73,11 @@ echo max_requests_jitter = 50
 echo timeout = 30
 echo keepalive = 2
 echo.
+echo # Proxies whose X-Forwarded-For / X-Forwarded-Proto headers are trusted. When
+echo # nginx runs in another container, set FORWARDED_ALLOW_IPS to its address so
+echo # the app sees real client IPs ^(used by the rate limiter^) and https links
+echo forwarded_allow_ips = os.getenv^('FORWARDED_ALLOW_IPS', '127.0.0.1'^)
+echo.
 echo # Restart workers after this many requests, to help prevent memory leaks
 echo max_requests = 1000
 echo max_requests_jitter = 50
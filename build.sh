@@ -94,6 +94,8 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Worker processes inherit this; the app divides the CPUs between their conversion pools
+os.environ["WORKERS"] = str(workers)
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 max_requests = 1000
@@ -101,6 +103,11 @@ max_requests_jitter = 50
 timeout = 30
 keepalive = 2
 
+# Proxies whose X-Forwarded-For / X-Forwarded-Proto headers are trusted. When
+# nginx runs in another container, set FORWARDED_ALLOW_IPS to its address so
+# the app sees real client IPs (used by the rate limiter) and https links
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50